@@ -1,28 +1,53 @@
 import os, sys
-from flask import Flask, request, jsonify
-from pypdf import PdfReader
-from resumeparser import ats_extractor
+# The utils shared with the Django project live at the repository root.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from flask import Flask, Response, request, jsonify, stream_with_context
+from resumeparser import FIELDS, ats_extractor, ats_extractor_stream
 from dotenv import load_dotenv
 from flask_cors import CORS
-from jobmatcher import analyze_job_match
-import requests
+from jobmatcher import analyze_job_match, analyze_job_match_stream
 import json
 load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 
 
 sys.path.insert(0, os.path.abspath(os.getcwd()))
 
-UPLOAD_PATH = "__DATA__"
-os.makedirs(UPLOAD_PATH, exist_ok=True)
+from resume_utils.batch import batch_events, parse_job_descriptions
+from resume_utils.cascade import cascade
+from resume_utils.cassette import cassette
+from resume_utils.fields import parse_fields
+from resume_utils.keywords import keyword_stats, parse_mode
+from resume_utils.llm import get_client, iter_deltas
+from resume_utils.llmcache import match_cache, parse_cache
+from resume_utils.pdftext import read_pdf_upload, text_cache, warm_pool
+from resume_utils.ratelimit import limiter
+from resume_utils.resumestore import resume_store
+from resume_utils.schema import schema_stats
+from resume_utils.sections import compaction_stats
+from resume_utils.tokens import token_usage
+from resume_utils.singleflight import inflight
+from resume_utils.sse import NDJSON_CONTENT_TYPE, SSE_CONTENT_TYPE, SSE_HEADERS, ndjson_stream, parse_format, sse_stream
 
 app = Flask(__name__)
 
+def sse_response(events):
+    """Stream ``(event, data)`` pairs to the client as Server-Sent Events."""
+    return Response(stream_with_context(sse_stream(events)), content_type=SSE_CONTENT_TYPE, headers=SSE_HEADERS)
+
+def ndjson_response(events):
+    """Stream ``(event, data)`` pairs to the client as JSON lines."""
+    return Response(stream_with_context(ndjson_stream(events)), content_type=NDJSON_CONTENT_TYPE, headers=SSE_HEADERS)
+
 @app.route("/")
 def index():
     return "Resume Parser API is running."
 
+def _with_resume_id(resume_text, parsed_data, fields):
+    """Store a full parse and add its ``resume_id``, for the match endpoints."""
+    if fields != FIELDS or "error" in parsed_data:
+        return parsed_data
+    return {**parsed_data, "resume_id": resume_store.put(resume_text, parsed_data)}
+
 @app.route("/process", methods=["POST"])
 def ats():
     if 'pdf_doc' not in request.files:
@@ -32,46 +57,197 @@ def ats():
     if doc.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
-    doc_path = os.path.join(UPLOAD_PATH, "file.pdf")
-    doc.save(doc_path)
+    # Optional ?fields=skills,email to extract only part of the schema
+    try:
+        fields = parse_fields(request.values.getlist('fields'), FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    data = read_pdf_upload(doc)
+    parsed_data = ats_extractor(data, fields=fields)
+
+    return jsonify(_with_resume_id(data, parsed_data, fields))
+
+
+@app.route("/process/stream", methods=["POST"])
+def ats_stream():
+    """/process as Server-Sent Events: a "field" event per field, then "done"."""
+    if 'pdf_doc' not in request.files:
+        return jsonify({"error": "No file part"}), 400
+
+    doc = request.files['pdf_doc']
+    if doc.filename == '':
+        return jsonify({"error": "No selected file"}), 400
+
+    try:
+        fields = parse_fields(request.values.getlist('fields'), FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    data = read_pdf_upload(doc)
 
-    data = _read_file_from_path(doc_path)
-    parsed_data = ats_extractor(data)
+    def events():
+        for event, event_data in ats_extractor_stream(data, fields=fields):
+            if event == "done":
+                event_data = _with_resume_id(data, event_data, fields)
+            yield event, event_data
 
-    return jsonify(parsed_data)
+    return sse_response(events())
 
-def _read_file_from_path(path):
-    reader = PdfReader(path)
-    data = ""
-    for page in reader.pages:
-        data += page.extract_text()
-    return data
 
+@app.route("/stats")
+def stats():
+    return jsonify({
+        "pdf_text": text_cache.stats(),
+        "llm_parse": parse_cache.stats(),
+        "llm_match": match_cache.stats(),
+        "llm_rate_limit": limiter.stats(),
+        "llm_hedging": get_client().hedge_policy.stats(),
+        "llm_singleflight": inflight.stats(),
+        "prompt_compaction": compaction_stats.stats(),
+        "llm_tokens": token_usage.stats(),
+        "llm_schema": schema_stats.stats(),
+        "llm_cascade": cascade.stats(),
+        "keyword_match": keyword_stats.stats(),
+        "llm_cassette": cassette.stats() if cassette is not None else None,
+        "resume_store": resume_store.stats(),
+    })
+
+
+def _match_resume(values):
+    """The resume of a match request: a stored ``resume_id`` or an uploaded ``pdf_doc``.
+
+    Returns ``(resume_text, None)`` for an upload, which still needs
+    parsing, or ``(None, parsed_data)`` for a stored resume. Raises
+    ``ValueError`` if there is neither and ``LookupError`` for an unknown ID.
+    """
+    resume_id = values.get('resume_id')
+    if resume_id:
+        parsed_data = resume_store.get(resume_id)
+        if parsed_data is None:
+            raise LookupError("Unknown resume_id; upload the resume again")
+        return None, parsed_data
+    doc = request.files.get('pdf_doc')
+    if doc is None or doc.filename == '':
+        raise ValueError("Missing file or resume_id")
+    return read_pdf_upload(doc), None
 
 @app.route("/analyze-match", methods=["POST"])
 def analyze_match():
-    if 'pdf_doc' not in request.files or 'job_description' not in request.form:
-        return jsonify({"error": "Missing file or job description"}), 400
+    """Match a resume against a job description.
+
+    The resume is a ``resume_id`` from /process or, failing that, a ``pdf_doc``.
+    """
+    if 'job_description' not in request.form:
+        return jsonify({"error": "Missing job description"}), 400
 
-    doc = request.files['pdf_doc']
     job_description = request.form['job_description']
-    doc_path = os.path.join(UPLOAD_PATH, "file.pdf")
-    doc.save(doc_path)
 
-    resume_text = _read_file_from_path(doc_path)
-    parsed_data = ats_extractor(resume_text)
-    match_data = analyze_job_match(parsed_data, job_description)
+    # Optional mode=llm|hybrid|fast; fast skips the LLM for the match
+    try:
+        mode = parse_mode(request.form.get('mode'))
+        resume_text, parsed_data = _match_resume(request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+
+    if parsed_data is None:
+        parsed_data = ats_extractor(resume_text)
+    match_data = analyze_job_match(parsed_data, job_description, mode=mode)
 
     return jsonify(match_data)
 
-@app.route("/generate-sample-jd", methods=["POST"])
-def generate_sample_jd():
-    data = request.get_json()
-    parsed_resume = data.get("resume")
+@app.route("/analyze-match/stream", methods=["POST"])
+def analyze_match_stream():
+    """/analyze-match as Server-Sent Events: a "field" event per score or list, then "done"."""
+    if 'job_description' not in request.form:
+        return jsonify({"error": "Missing job description"}), 400
 
-    if not parsed_resume:
-        return jsonify({"error": "No resume data provided"}), 400
+    job_description = request.form['job_description']
+    try:
+        mode = parse_mode(request.form.get('mode'))
+        resume_text, resume_data = _match_resume(request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+
+    def events():
+        # The match needs the whole resume, so parsing it is not streamed.
+        parsed_data = resume_data if resume_data is not None else ats_extractor(resume_text)
+        if "error" in parsed_data:
+            yield "error", parsed_data
+            return
+        yield from analyze_job_match_stream(parsed_data, job_description, mode=mode)
+
+    return sse_response(events())
+
+def _batch_request():
+    """Parameters of a batch match, from a JSON body or a form.
+
+    The resume is a ``resume_id``, parsed ``resume_data`` or a ``pdf_doc``.
+    Returns ``(resume_text, resume_data, job_descriptions, mode, format)``;
+    one of ``resume_text`` and ``resume_data`` is None. Raises
+    ``ValueError`` for a bad request and ``LookupError`` for an unknown ID.
+    """
+    if request.is_json:
+        values = request.get_json(silent=True)
+        if not isinstance(values, dict):
+            raise ValueError("Request body must be a JSON object")
+        resume_data, job_descriptions = values.get('resume_data'), values.get('job_descriptions')
+    else:
+        values = request.form
+        resume_data = values.get('resume_data')
+        if resume_data:
+            try:
+                resume_data = json.loads(resume_data)
+            except json.JSONDecodeError:
+                raise ValueError("resume_data must be JSON")
+        job_descriptions = values.getlist('job_descriptions')
+
+    mode = parse_mode(values.get('mode'))
+    stream_format = parse_format(values.get('format'))
+    job_descriptions = parse_job_descriptions(job_descriptions)
+    if resume_data:
+        if not isinstance(resume_data, dict):
+            raise ValueError("resume_data must be a JSON object")
+        return None, resume_data, job_descriptions, mode, stream_format
+    resume_text, resume_data = _match_resume(values)
+    return resume_text, resume_data, job_descriptions, mode, stream_format
+
+@app.route("/analyze-match/batch", methods=["POST"])
+def analyze_match_batch():
+    """Match one resume against many job descriptions, streaming each result as it completes.
 
+    Takes a ``resume_id``, parsed ``resume_data`` or a ``pdf_doc``, and a
+    list of ``job_descriptions``; an uploaded resume is parsed once. Streams a "resume"
+    event with the parse (when a file was sent), a "match" event per job
+    description in completion order, then "done", as NDJSON (default) or,
+    with ``format=sse``, Server-Sent Events.
+    """
+    try:
+        resume_text, resume_data, job_descriptions, mode, stream_format = _batch_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+
+    def events():
+        parsed_data = resume_data
+        if parsed_data is None:
+            parsed_data = ats_extractor(resume_text)
+            if "error" in parsed_data:
+                yield "error", parsed_data
+                return
+            yield "resume", parsed_data
+        yield from batch_events(
+            lambda job_description: analyze_job_match(parsed_data, job_description, mode=mode), job_descriptions
+        )
+
+    return sse_response(events()) if stream_format == "sse" else ndjson_response(events())
+
+def sample_jd_payload(parsed_resume):
     # Use the LLM to generate a job description based on resume
     prompt = f"""
 You are a job description generator. Based on the candidate's resume details below, generate a realistic job description that this person would be suitable for. Format it professionally. Do not return markdown or commentary. Resume:
@@ -79,12 +255,7 @@ You are a job description generator. Based on the candidate's resume details bel
 {json.dumps(parsed_resume, indent=2)}
     """
 
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    payload = {
+    return {
         "model": "llama3-70b-8192",
         "messages": [
             {"role": "system", "content": "You are a helpful assistant that writes job descriptions."},
@@ -93,8 +264,18 @@ You are a job description generator. Based on the candidate's resume details bel
         "temperature": 0.4
     }
 
+@app.route("/generate-sample-jd", methods=["POST"])
+def generate_sample_jd():
+    data = request.get_json()
+    parsed_resume = data.get("resume")
+
+    if not parsed_resume:
+        return jsonify({"error": "No resume data provided"}), 400
+
+    payload = sample_jd_payload(parsed_resume)
+
     try:
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload)
+        response = get_client().chat(payload)
         if response.status_code == 200:
             content = response.json()["choices"][0]["message"]["content"].strip()
             # Remove code block if present
@@ -105,9 +286,37 @@ You are a job description generator. Based on the candidate's resume details bel
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/generate-sample-jd/stream", methods=["POST"])
+def generate_sample_jd_stream():
+    """/generate-sample-jd as Server-Sent Events: "token" events with the text as it is written, then "done"."""
+    data = request.get_json()
+    parsed_resume = data.get("resume")
+
+    if not parsed_resume:
+        return jsonify({"error": "No resume data provided"}), 400
+
+    def events():
+        try:
+            response = get_client().stream(sample_jd_payload(parsed_resume))
+            if response.status_code != 200:
+                yield "error", {"error": "Failed to generate job description", "message": response.text}
+                return
+            parts = []
+            for delta in iter_deltas(response):
+                parts.append(delta)
+                yield "token", {"text": delta}
+        except Exception as e:
+            yield "error", {"error": str(e)}
+            return
+        # Same cleanup as the non-streamed endpoint
+        yield "done", {"job_description": "".join(parts).replace("```", "").strip()}
+
+    return sse_response(events())
+
 
 
 CORS(app)  # Enable CORS for all routes
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
+    warm_pool()
     app.run(host="0.0.0.0", port=port,debug=True)
\ No newline at end of file
@@ -1,20 +1,31 @@
-import os
 import json
-import requests
 from dotenv import load_dotenv
+from resume_utils.jsonstream import FieldStream
+from resume_utils.keywords import MATCH_MODE, keyword_match
+from resume_utils.llm import completion_content, get_client, iter_deltas, json_mode
+from resume_utils.llmcache import json_digest, match_cache, text_digest
+from resume_utils.jsonscan import parse_json
+from resume_utils.schema import coerce, conform
+from resume_utils.singleflight import inflight
+from resume_utils.tokens import estimate_tokens, prompt_budget, truncate_to_tokens
 
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Bump whenever the match prompts change so cached results expire.
+PROMPT_VERSION = "4"
 
-def analyze_job_match(resume_data: dict, job_description: str, model="llama3-70b-8192") -> dict:
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
+MATCH_SCHEMA = {
+    "overallMatch": "score",
+    "skillsMatch": "score",
+    "experienceMatch": "score",
+    "educationMatch": "score",
+    "missingKeywords": "strings",
+    "recommendedImprovements": "strings",
+}
 
-    prompt = f"""
+SYSTEM_PROMPT = "You are a helpful assistant that evaluates job-resume matches."
+
+MATCH_PROMPT = """
 You are an AI job match analyzer. Compare the parsed resume with the job description and return the following:
 
 - overallMatch (0-100): How well the resume matches overall
@@ -27,52 +38,174 @@ You are an AI job match analyzer. Compare the parsed resume with the job descrip
 Return JSON only, without any markdown or commentary.
 
 Resume Data:
-{json.dumps(resume_data, indent=2)}
+{resume_data}
 
 Job Description:
 {job_description}
 """
 
-    payload = {
+# Hybrid mode: the scores are computed locally, the LLM only writes advice.
+IMPROVEMENTS_SCHEMA = {"recommendedImprovements": "strings"}
+
+IMPROVEMENTS_PROMPT = """
+You are an AI job match analyzer. Compare the parsed resume with the job description and return the following:
+
+- recommendedImprovements: Specific changes to improve the match
+
+These keywords from the job description are missing in the resume: {missing_keywords}
+
+Return JSON only, without any markdown or commentary.
+
+Resume Data:
+{resume_data}
+
+Job Description:
+{job_description}
+"""
+
+def analyze_job_match(resume_data: dict, job_description: str, model="llama3-70b-8192", mode=MATCH_MODE) -> dict:
+    """Score ``resume_data`` against ``job_description``.
+
+    ``mode`` is one of ``resume_utils.keywords.MATCH_MODES``: "llm" has the LLM do
+    the whole analysis, "hybrid" only asks it for the recommended
+    improvements, and "fast" never calls it.
+    """
+    if mode == "fast":
+        return keyword_match(resume_data, job_description)
+
+    cache_key = _cache_key(resume_data, job_description, model, mode)
+    cached = match_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Identical comparisons running concurrently share one LLM call.
+    return inflight.do(cache_key, _analyze, resume_data, job_description, model, cache_key, mode)
+
+def _cache_key(resume_data: dict, job_description: str, model: str, mode: str) -> str:
+    return match_cache.key(json_digest(resume_data), text_digest(job_description), model, PROMPT_VERSION, mode)
+
+def _payload(resume_data: dict, job_description: str, model: str, local=None) -> dict:
+    resume_json = json.dumps(resume_data, indent=2)
+    if local is None:
+        template, missing_keywords = MATCH_PROMPT, ""
+    else:
+        template, missing_keywords = IMPROVEMENTS_PROMPT, ", ".join(local["missingKeywords"]) or "none"
+    # The job description gets whatever room the template and resume leave.
+    overhead = (
+        estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(template)
+        + estimate_tokens(resume_json) + estimate_tokens(missing_keywords)
+    )
+    job_description = truncate_to_tokens(job_description, prompt_budget(model, overhead))
+    prompt = template.format(resume_data=resume_json, job_description=job_description, missing_keywords=missing_keywords)
+
+    return json_mode({
         "model": model,
         "messages": [
-            {"role": "system", "content": "You are a helpful assistant that evaluates job-resume matches."},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ],
         "temperature": 0.3
-    }
+    })
+
+def _failed(error: str, local=None) -> dict:
+    if local is not None:
+        # The local scores still stand; only the LLM's advice is missing
+        return local
+    # Zero scores and empty lists, so clients can render a failed match as-is
+    return coerce({"error": error}, MATCH_SCHEMA)
+
+def _analyze(resume_data: dict, job_description: str, model: str, cache_key: str, mode: str) -> dict:
+    local = keyword_match(resume_data, job_description) if mode == "hybrid" else None
+    payload = _payload(resume_data, job_description, model, local)
 
     try:
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-        if response.status_code == 200:
-            content = response.json()['choices'][0]['message']['content']
-
-            # Trim markdown or commentary if included
-            content = content.strip()
-            content = content.replace("```json", "").replace("```", "").strip()
-            last_brace = content.rfind("}")
-            if last_brace != -1:
-                content = content[:last_brace + 1]
+        response = get_client().chat(payload, hedge="match")
+        content = completion_content(response)
+        if content is not None:
             print(content)
 
-            return json.loads(content)
+            # Tolerates markdown, commentary, trailing commas and cut-off output
+            if local is None:
+                match_data = conform(parse_json(content), MATCH_SCHEMA)
+            else:
+                improvements = conform(parse_json(content), IMPROVEMENTS_SCHEMA)["recommendedImprovements"]
+                match_data = dict(local, recommendedImprovements=improvements)
+            match_cache.set(cache_key, match_data)
+            return match_data
         else:
-            return {
-                "error": f"API request failed with status code {response.status_code}",
-                "overallMatch": 0,
-                "skillsMatch": 0,
-                "experienceMatch": 0,
-                "educationMatch": 0,
-                "missingKeywords": [],
-                "recommendedImprovements": []
-            }
+            return _failed(f"API request failed with status code {response.status_code}", local)
+    except Exception as e:
+        return _failed(str(e), local)
+
+def analyze_job_match_stream(resume_data: dict, job_description: str, model="llama3-70b-8192", mode=MATCH_MODE):
+    """Like analyze_job_match, but yields ``(event, data)`` pairs as results come in.
+
+    A ``("field", {"name": ..., "value": ...})`` pair is yielded for each
+    score or list as soon as it is known, then ``("done", match_data)``, or
+    ``("error", {...})`` if the call failed. In hybrid mode the local scores
+    come first, then the LLM's recommendations.
+    """
+    if mode == "fast":
+        match_data = keyword_match(resume_data, job_description)
+        for key, value in match_data.items():
+            yield "field", {"name": key, "value": value}
+        yield "done", match_data
+        return
+
+    cache_key = _cache_key(resume_data, job_description, model, mode)
+    cached = match_cache.get(cache_key)
+    if cached is not None:
+        for key, value in cached.items():
+            yield "field", {"name": key, "value": value}
+        yield "done", cached
+        return
+
+    local = None
+    schema = MATCH_SCHEMA
+    if mode == "hybrid":
+        local = keyword_match(resume_data, job_description)
+        schema = IMPROVEMENTS_SCHEMA
+        for key, value in local.items():
+            if key not in schema:
+                yield "field", {"name": key, "value": value}
+
+    stream = FieldStream()
+    try:
+        response = get_client().stream(_payload(resume_data, job_description, model, local))
+        if response.status_code != 200:
+            yield from _stream_failed(f"API request failed with status code {response.status_code}", local)
+            return
+        for delta in iter_deltas(response):
+            for key, value in stream.feed(delta):
+                if local is None or key in schema:
+                    yield "field", _field(key, value)
+        match_data, remaining = stream.finish()
     except Exception as e:
-        return {
-            "error": str(e),
-            "overallMatch": 0,
-            "skillsMatch": 0,
-            "experienceMatch": 0,
-            "educationMatch": 0,
-            "missingKeywords": [],
-            "recommendedImprovements": []
-        }
+        yield from _stream_failed(str(e), local)
+        return
+
+    for key, value in remaining:
+        if local is None or key in schema:
+            yield "field", _field(key, value)
+    conform(match_data, schema)
+    # Fields the model left out, filled in by the schema
+    for key, value in match_data.items():
+        if key in schema and key not in stream.emitted:
+            yield "field", _field(key, value)
+    if local is not None:
+        match_data = dict(local, recommendedImprovements=match_data["recommendedImprovements"])
+    match_cache.set(cache_key, match_data)
+    yield "done", match_data
+
+def _stream_failed(error, local):
+    if local is None:
+        yield "error", _failed(error)
+        return
+    # Fall back to the local recommendations, as analyze_job_match does
+    yield "field", _field("recommendedImprovements", local["recommendedImprovements"])
+    yield "done", local
+
+def _field(key, value):
+    if key in MATCH_SCHEMA:
+        value = coerce(value, MATCH_SCHEMA[key])
+    return {"name": key, "value": value}
@@ -1,77 +1,227 @@
-import os
-import re
 import json
 from dotenv import load_dotenv
 import requests
+from resume_utils.cascade import cascade, resume_confidence
+from resume_utils.contacts import CONTACT_FIELDS, extract_contacts, merge_contacts
+from resume_utils.fields import build_prompt
+from resume_utils.jsonscan import extract_json
+from resume_utils.jsonstream import FieldStream
+from resume_utils.llm import completion_content, get_client, iter_deltas, json_mode
+from resume_utils.llmcache import parse_cache, text_digest
+from resume_utils.chunking import chunk_resume, map_chunks, merge_partials
+from resume_utils.schema import coerce, conform, select_schema
+from resume_utils.singleflight import inflight
+from resume_utils.tokens import estimate_tokens, prompt_budget
 
 load_dotenv()
 
-# API details
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Bump whenever the ats_extractor prompt changes so cached results expire.
+PROMPT_VERSION = "9"
 
-def ats_extractor(resume_data, model="llama3-70b-8192"):
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    prompt = '''
+PROMPT_HEAD = '''
    You are an AI bot designed to parse resumes. Extract the following fields in **valid JSON format only**. Do not add explanations, code blocks, or any trailing notes. Return only a JSON object.
-    - name
-    - email
-    - phone
-    - linkedin
-    - address (if available)
-    - portfolio (if available)
-    - summary (2-3 sentence professional summary)
-    - skills (as a list)
-    - experience_title
-    - company
-    - start_date (if available)
-    - end_date (if available)
-    - experience_detail (main bullet point or summary of experience)
-    - degree
-    - university
-    - graduation_year (if available)
-    - Projects (if available): list of projects with
-        - project_title
-        - project_detail
-        - project_technologies (if available)
-    
+'''
+
+# Selectable field -> the lines of the prompt that ask for it.
+PROMPT_FIELDS = {
+    "name": "    - name\n",
+    "address": "    - address (if available)\n",
+    "summary": "    - summary (2-3 sentence professional summary)\n",
+    "skills": "    - skills (as a list)\n",
+    "experience": (
+        "    - experience_title\n"
+        "    - company\n"
+        "    - start_date (if available)\n"
+        "    - end_date (if available)\n"
+        "    - experience_detail (main bullet point or summary of experience)\n"
+    ),
+    "education": (
+        "    - degree\n"
+        "    - university\n"
+        "    - graduation_year (if available)\n"
+    ),
+    "projects": (
+        "    - Projects (if available): list of projects with\n"
+        "        - project_title\n"
+        "        - project_detail\n"
+        "        - project_technologies (if available)\n"
+    ),
+}
+
+PROMPT_TAIL = '''    
     Return only a valid JSON object. Do not include any commentary, notes, or markdown formatting.
     
     Resume text:
     \"\"\"{resume_data}\"\"\"
     '''
 
-    payload = {
+FIELDS = tuple(PROMPT_FIELDS) + CONTACT_FIELDS
+
+# Selectable field -> the keys it adds to the result, and their types.
+RESUME_SCHEMAS = {
+    "name": {"name": "string"},
+    "address": {"address": "string"},
+    "summary": {"summary": "string"},
+    "skills": {"skills": "skills"},
+    "experience": {
+        "experience_title": "string",
+        "company": "string",
+        "start_date": "string",
+        "end_date": "string",
+        "experience_detail": "string",
+    },
+    "education": {
+        "degree": "string",
+        "university": "string",
+        "graduation_year": "string",
+    },
+    "projects": {
+        "Projects": [{"project_title": "string", "project_detail": "string", "project_technologies": "strings"}],
+    },
+}
+
+# Flat fields that together describe one job or one degree. A chunked
+# resume can find a different one in every chunk, and all of them are kept.
+RECORD_KEYS = (tuple(RESUME_SCHEMAS["experience"]), tuple(RESUME_SCHEMAS["education"]))
+
+SYSTEM_PROMPT = "You are a helpful assistant that parses resumes into structured JSON data."
+
+# Keys every resume has; the cascade escalates when a small model leaves them empty.
+CORE_KEYS = ("name", "skills", "company")
+
+def ats_extractor(resume_data, model=None, fields=FIELDS):
+    """Parse ``resume_data``. Without a ``model``, the model cascade picks one."""
+    cache_key = parse_cache.key(text_digest(resume_data), model or cascade.name, PROMPT_VERSION, ",".join(fields))
+    cached = parse_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Identical resumes parsed concurrently share one LLM call.
+    return inflight.do(cache_key, _extract, resume_data, model, cache_key, fields)
+
+def _extract(resume_data, model, cache_key, fields):
+    parsed_data = {}
+    # Contact-only selections never need the LLM
+    if any(field in PROMPT_FIELDS for field in fields):
+        schema = select_schema(RESUME_SCHEMAS, fields)
+        parsed_data = cascade.run(
+            lambda tier: _extract_with(resume_data, tier, fields, schema),
+            lambda result: resume_confidence(resume_data, result, CORE_KEYS),
+            models=[model] if model else None,
+        )
+        if "error" in parsed_data:
+            return parsed_data
+
+    # Contact fields come from regexes, not the LLM
+    merge_contacts(parsed_data, extract_contacts(resume_data), fields)
+    parse_cache.set(cache_key, parsed_data)
+    return parsed_data
+
+def _extract_with(resume_data, model, fields, schema):
+    prompt = build_prompt(PROMPT_HEAD, PROMPT_FIELDS, fields, PROMPT_TAIL)
+    # Long resumes are extracted chunk by chunk in parallel, then merged.
+    chunks = _chunks(resume_data, model, prompt)
+    results = map_chunks(lambda chunk: _extract_chunk(chunk, model, prompt), chunks)
+    for result in results:
+        if "error" in result:
+            return result
+    # Fix types and fill in anything the model left out, before the cascade
+    # judges the result
+    return conform(merge_partials(results, RECORD_KEYS), schema)
+
+def _chunks(resume_data, model, prompt):
+    # Each chunk gets whatever the model's context window has left over.
+    budget = prompt_budget(model, estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt))
+    return chunk_resume(resume_data, budget)
+
+def _payload(resume_text, model, prompt):
+    return json_mode({
         "model": model,
         "messages": [
-            {"role": "system", "content": "You are a helpful assistant that parses resumes into structured JSON data."},
-            {"role": "user", "content": prompt.format(resume_data=resume_data)}
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt.format(resume_data=resume_text)}
         ],
         "temperature": 0.2
-    }
+    })
+
+def ats_extractor_stream(resume_data, model=None, fields=FIELDS):
+    """Like ats_extractor, but yields ``(event, data)`` pairs as results come in.
+
+    A ``("field", {"name": ..., "value": ...})`` pair is yielded for each
+    top-level field as soon as the LLM has finished writing it, then
+    ``("done", parsed_data)``, or ``("error", {...})`` if the call failed.
+    Fields already sent can't be taken back, so without a ``model`` the
+    stream skips the cascade and uses its most capable tier.
+    """
+    model = model or cascade.models[-1]
+    cache_key = parse_cache.key(text_digest(resume_data), model, PROMPT_VERSION, ",".join(fields))
+    cached = parse_cache.get(cache_key)
+    if cached is not None:
+        yield from _field_events(cached.items())
+        yield "done", cached
+        return
 
+    # Contact fields are ready before the LLM has even been called
+    contacts = merge_contacts({}, extract_contacts(resume_data), fields)
+    yield from _field_events(contacts.items())
+
+    prompt = build_prompt(PROMPT_HEAD, PROMPT_FIELDS, fields, PROMPT_TAIL)
+    chunks = _chunks(resume_data, model, prompt) if any(field in PROMPT_FIELDS for field in fields) else []
+    if len(chunks) != 1:
+        # Nothing to stream: contacts only, or chunks extracted in parallel.
+        parsed_data = ats_extractor(resume_data, model, fields)
+        if "error" in parsed_data:
+            yield "error", parsed_data
+            return
+        yield from _field_events((key, value) for key, value in parsed_data.items() if key not in contacts)
+        yield "done", parsed_data
+        return
+
+    schema = select_schema(RESUME_SCHEMAS, fields)
+    stream = FieldStream()
     try:
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-        
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
-
-            # Remove any markdown code block formatting
-            content = re.sub(r"^```(json)?", "", content, flags=re.IGNORECASE).strip()
-            content = re.sub(r"```$", "", content).strip()
-
-            # Try to isolate valid JSON block using regex if needed
-            match = re.search(r"\{[\s\S]*\}", content)
-            if match:
-                json_string = match.group()
+        response = get_client().stream(_payload(chunks[0], model, prompt))
+        if response.status_code != 200:
+            yield "error", {"error": f"API request failed with status code {response.status_code}", "message": response.text}
+            return
+        for delta in iter_deltas(response):
+            yield from _field_events(stream.feed(delta), skip=contacts, schema=schema)
+        parsed_data, remaining = stream.finish()
+    except requests.exceptions.RequestException as e:
+        yield "error", {"error": "Request failed", "message": str(e)}
+        return
+    except json.JSONDecodeError as e:
+        yield "error", {"error": "Failed to parse JSON", "raw": stream.text, "message": str(e)}
+        return
+
+    yield from _field_events(remaining, skip=contacts, schema=schema)
+    conform(parsed_data, schema)
+    # Fields the model left out, filled in by the schema
+    yield from _field_events(((key, value) for key, value in parsed_data.items() if key not in stream.emitted), skip=contacts)
+    merge_contacts(parsed_data, contacts, fields)
+    parse_cache.set(cache_key, parsed_data)
+    yield "done", parsed_data
+
+def _field_events(fields, skip=(), schema=None):
+    for key, value in fields:
+        if key not in skip:
+            if schema and key in schema:
+                value = coerce(value, schema[key])
+            yield "field", {"name": key, "value": value}
+
+def _extract_chunk(resume_text, model, prompt):
+    payload = _payload(resume_text, model, prompt)
+
+    try:
+        response = get_client().chat(payload, hedge="parse")
+        content = completion_content(response)
+
+        if content is not None:
+            # Isolate the JSON object, dropping fences, commentary and trailing commas
+            json_string = extract_json(content)
+            if json_string is not None:
                 try:
-                    parsed_data = json.loads(json_string)
-                    return parsed_data
+                    return json.loads(json_string, strict=False)
                 except json.JSONDecodeError as e:
                     return {"error": "Failed to parse JSON", "raw": json_string, "message": str(e)}
             else:
@@ -78,15 +78,27 @@ const Index = () => {
     setIsAnalyzing(true);
     setMatchData(null);
   
-    const formData = new FormData();
-    formData.append('pdf_doc', file);
-    formData.append('job_description', jobDescription);
-  
-    try {
-      const res = await fetch('https://resume-parser-bxzq.onrender.com/analyze-match', {
+    const analyzeMatch = (resumeId?: string) => {
+      const formData = new FormData();
+      if (resumeId) {
+        formData.append('resume_id', resumeId);
+      } else {
+        formData.append('pdf_doc', file);
+      }
+      formData.append('job_description', jobDescription);
+      return fetch('https://resume-parser-bxzq.onrender.com/analyze-match', {
         method: 'POST',
         body: formData,
       });
+    };
+  
+    try {
+      // Reuse the server's parse when there is one, instead of re-uploading the PDF
+      let res = await analyzeMatch(parsedData?.resume_id);
+      if (res.status === 404 && parsedData?.resume_id) {
+        // The stored parse has expired; send the file itself
+        res = await analyzeMatch();
+      }
   
       if (!res.ok) {
         throw new Error("Failed to analyze match");
@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ParsedResume
+
+
+@admin.register(ParsedResume)
+class ParsedResumeAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'user', 'created_at', 'updated_at')
+    search_fields = ('content_hash', 'user__email')
+    readonly_fields = ('content_hash', 'terms', 'created_at', 'updated_at')
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from resume_api.models import ParsedResume
+
+class Command(BaseCommand):
+    help = 'Delete parsed resumes older than PARSED_RESUME_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        deleted, _ = ParsedResume.objects.expired().delete()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Deleted {deleted} parsed resumes older than {settings.PARSED_RESUME_RETENTION_DAYS} days'
+            )
+        )
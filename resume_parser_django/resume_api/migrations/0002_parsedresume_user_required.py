@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def delete_anonymous_resumes(apps, schema_editor):
+    ParsedResume = apps.get_model("resume_api", "ParsedResume")
+    ParsedResume.objects.filter(user__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resume_api", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_anonymous_resumes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="parsedresume",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="parsed_resumes",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
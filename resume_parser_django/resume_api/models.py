@@ -1,3 +1,69 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+from resume_utils.llmcache import text_digest
+from resume_utils.ranking import term_vector
+
+
+class ParsedResumeQuerySet(models.QuerySet):
+    def current(self):
+        """Resumes parsed within the retention period"""
+        return self.filter(updated_at__gte=ParsedResume.retention_cutoff())
+
+    def expired(self):
+        """Resumes past the retention period, for ``purge_parsed_resumes``"""
+        return self.filter(updated_at__lt=ParsedResume.retention_cutoff())
+
+
+class ParsedResume(models.Model):
+    """A user's parsed resume, kept for ranking and reuse by ``resume_id``"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='parsed_resumes')
+    # SHA-256 of the resume text, whitespace-normalized
+    content_hash = models.CharField(max_length=64, db_index=True)
+    data = models.JSONField()
+    # Unit-length {term: weight} vector, precomputed for ranking
+    terms = models.JSONField(default=dict)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ParsedResumeQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.data.get('name') or 'Unnamed'} ({self.content_hash[:12]})"
+
+    @staticmethod
+    def retention_cutoff():
+        return timezone.now() - timedelta(days=settings.PARSED_RESUME_RETENTION_DAYS)
+
+    @classmethod
+    def store(cls, resume_text, parsed_data, user):
+        """Save (or refresh) the parse of ``resume_text`` for ``user``
+
+        Only authenticated users' resumes are kept; returns None otherwise.
+        """
+        if user is None or not user.is_authenticated:
+            return None
+        resume, _ = cls.objects.update_or_create(
+            user=user,
+            content_hash=text_digest(resume_text),
+            defaults={"data": parsed_data, "terms": term_vector(parsed_data)},
+        )
+        return resume
+
+    @classmethod
+    def lookup(cls, resume_id, user):
+        """Parsed data ``user`` stored under ``resume_id``, or None"""
+        if user is None or not user.is_authenticated:
+            return None
+        resume = cls.objects.current().filter(user=user, content_hash=resume_id).first()
+        return resume.data if resume is not None else None
 
-# Create your models here.
+    class Meta:
+        ordering = ['-updated_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'content_hash'], name='unique_parsed_resume_per_user'),
+        ]
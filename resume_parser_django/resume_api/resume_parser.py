@@ -1,104 +1,109 @@
-import os
-import re
 import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+import httpx
 import requests
+from resume_utils.cascade import cascade, resume_confidence
+from resume_utils.contacts import CONTACT_FIELDS, extract_contacts, merge_contacts
+from resume_utils.fields import build_prompt
+from resume_utils.jsonscan import extract_json
+from resume_utils.jsonstream import FieldStream
+from resume_utils.keywords import MATCH_MODE, keyword_match
+from resume_utils.llm import RateLimitExceeded, completion_content, get_async_client, get_client, iter_deltas, json_mode
+from resume_utils.llmcache import json_digest, match_cache, parse_cache, text_digest
+from resume_utils.ranking import RANK_RERANK_WORKERS
+from resume_utils.chunking import chunk_resume, map_chunks, merge_partials
+from resume_utils.schema import coerce, conform, select_schema
+from resume_utils.singleflight import inflight
+from resume_utils.tokens import estimate_tokens, prompt_budget, truncate_to_tokens
 
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Bump whenever a prompt changes so cached results expire.
+PROMPT_VERSION = "8"
+MATCH_PROMPT_VERSION = "4"
 
-def clean_json_string(s):
-    # Remove trailing commas before } or ]
-    s = re.sub(r",\s*([}\]])", r"\1", s)
-    # Remove markdown formatting
-    s = re.sub(r"^```(json)?", "", s, flags=re.IGNORECASE).strip()
-    s = re.sub(r"```$", "", s).strip()
-    return s
+ATS_PROMPT_HEAD = '''
+    You are an AI bot designed to act as a professional for parsing resumes. You are given a resume and your job is to extract the following information:
+'''
 
-def ats_extractor(resume_data, model="llama3-70b-8192"):
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
+# Selectable field -> the lines of the prompt that ask for it.
+ATS_PROMPT_FIELDS = {
+    "name": "    - name\n",
+    "address": "    - address (if available)\n",
+    "summary": "    - summary (2-3 sentence professional summary)\n",
+    "skills": "    - skills (as a list)\n",
+    "experience": (
+        "    - experience: list of work experience entries with\n"
+        "        - title (job title)\n"
+        "        - company\n"
+        "        - start_date (if available)\n"
+        "        - end_date (if available)\n"
+        "        - description (main bullet point or summary of experience)\n"
+    ),
+    "education": (
+        "    - education: list of education entries with\n"
+        "        - degree\n"
+        "        - university\n"
+        "        - graduation_year (if available)\n"
+    ),
+    "projects": (
+        "    - projects: list of projects with\n"
+        "        - name (project name)\n"
+        "        - description (project description)\n"
+        "        - technologies (if available)\n"
+    ),
+}
 
-    prompt = '''
-    You are an AI bot designed to act as a professional for parsing resumes. You are given a resume and your job is to extract the following information:
-    - name
-    - email
-    - phone
-    - linkedin
-    - address (if available)
-    - portfolio (if available)
-    - summary (2-3 sentence professional summary)
-    - skills (as a list)
-    - experience: list of work experience entries with
-        - title (job title)
-        - company
-        - start_date (if available)
-        - end_date (if available)
-        - description (main bullet point or summary of experience)
-    - education: list of education entries with
-        - degree
-        - university
-        - graduation_year (if available)
-    - projects: list of projects with
-        - name (project name)
-        - description (project description)
-        - technologies (if available)
-    
+ATS_PROMPT_TAIL = '''    
     Only return valid JSON. Ensure all strings are properly closed and formatted. Do not include trailing commas, incomplete objects, or markdown formatting.
     
     Resume text:
     \"\"\"{resume_data}\"\"\"
     '''
 
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": "You are a helpful assistant that parses resumes into structured JSON data."},
-            {"role": "user", "content": prompt.format(resume_data=resume_data)}
-        ],
-        "temperature": 0.2
-    }
-
-    try:
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
+ATS_FIELDS = tuple(ATS_PROMPT_FIELDS) + CONTACT_FIELDS
 
-            # Try to isolate valid JSON block using regex
-            match = re.search(r"\{[\s\S]*\}", content)
-            if match:
-                json_string = clean_json_string(match.group())
+# Selectable field -> the keys it adds to the result, and their types.
+ATS_SCHEMAS = {
+    "name": {"name": "string"},
+    "address": {"address": "string"},
+    "summary": {"summary": "string"},
+    "skills": {"skills": "skills"},
+    "experience": {
+        "experience": [{
+            "title": "string",
+            "company": "string",
+            "start_date": "string",
+            "end_date": "string",
+            "description": "string",
+        }],
+    },
+    "education": {
+        "education": [{"degree": "string", "university": "string", "graduation_year": "string"}],
+    },
+    "projects": {
+        "projects": [{"name": "string", "description": "string", "technologies": "strings"}],
+    },
+}
 
-                try:
-                    parsed_data = json.loads(json_string)
-                    return parsed_data
-                except json.JSONDecodeError as e:
-                    return {"error": "Failed to parse JSON after cleaning", "raw": json_string, "message": str(e)}
-            else:
-                return {"error": "No valid JSON object found", "raw": content}
+# Keys every resume has; the cascade escalates when a small model leaves them empty.
+ATS_CORE_KEYS = ("name", "skills", "experience")
 
-        else:
-            return {"error": f"API request failed with status code {response.status_code}", "message": response.text}
+MATCH_SCHEMA = {
+    "overallMatch": "score",
+    "skillsMatch": "score",
+    "experienceMatch": "score",
+    "educationMatch": "score",
+    "missingKeywords": "strings",
+    "recommendedImprovements": "strings",
+}
 
-    except requests.exceptions.RequestException as e:
-        return {"error": "Request failed", "message": str(e)}
+ATS_SYSTEM_PROMPT = "You are a helpful assistant that parses resumes into structured JSON data."
+MATCH_SYSTEM_PROMPT = "You are an expert HR professional that analyzes resume-job matches and provides detailed scoring and recommendations."
 
-    except json.JSONDecodeError:
-        return {"error": "Failed to parse JSON from response", "raw": response.text}
-
-def match_analyzer(resume_data, job_description, model="llama3-70b-8192"):
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    prompt = '''
+MATCH_PROMPT = '''
     You are an expert HR professional and resume analyzer. Your task is to analyze how well a candidate's resume matches a specific job description.
 
     Resume Data:
@@ -129,54 +134,357 @@ def match_analyzer(resume_data, job_description, model="llama3-70b-8192"):
     Only return valid JSON. Do not include any markdown formatting or additional text.
     '''
 
-    payload = {
+# Hybrid match mode: the scores are computed locally, the LLM only writes advice.
+IMPROVEMENTS_SCHEMA = {"recommendedImprovements": "strings"}
+
+IMPROVEMENTS_PROMPT = '''
+    You are an expert HR professional and resume analyzer. Your task is to suggest how a candidate's resume could better match a specific job description.
+
+    Resume Data:
+    {resume_data}
+
+    Job Description:
+    {job_description}
+
+    Keywords from the job description that are missing in the resume: {missing_keywords}
+
+    You MUST return a JSON response with EXACTLY this structure:
+    {{
+        "recommendedImprovements": ["improvement1", "improvement2", ...]
+    }}
+
+    - recommendedImprovements: Specific actionable suggestions to improve the resume for this job
+
+    Only return valid JSON. Do not include any markdown formatting or additional text.
+    '''
+
+def _parse_response(response, cache, cache_key, repair=None):
+    """Turn a chat completion response into the result dict, caching successes"""
+    try:
+        content = completion_content(response)
+    except json.JSONDecodeError:
+        return {"error": "Failed to parse JSON from response", "raw": response.text}
+
+    if content is None:
+        return {"error": f"API request failed with status code {response.status_code}", "message": response.text}
+    content = content.strip()
+
+    # Isolate the JSON object, dropping fences, commentary and trailing commas
+    json_string = extract_json(content)
+    if json_string is None:
+        return {"error": "No valid JSON object found", "raw": content}
+
+    try:
+        parsed_data = json.loads(json_string, strict=False)
+    except json.JSONDecodeError as e:
+        return {"error": "Failed to parse JSON after cleaning", "raw": json_string, "message": str(e)}
+
+    if repair:
+        repair(parsed_data)
+    if cache is not None:
+        cache.set(cache_key, parsed_data)
+    return parsed_data
+
+def _call_llm(payload, cache, cache_key, repair=None, route="parse"):
+    try:
+        response = get_client().chat(payload, hedge=route)
+        return _parse_response(response, cache, cache_key, repair)
+    except requests.exceptions.RequestException as e:
+        return {"error": "Request failed", "message": str(e)}
+
+async def _acall_llm(payload, cache, cache_key, repair=None):
+    try:
+        response = await get_async_client().chat(payload)
+        return _parse_response(response, cache, cache_key, repair)
+    except (httpx.HTTPError, RateLimitExceeded) as e:
+        return {"error": "Request failed", "message": str(e)}
+
+def _field_events(fields, skip=(), schema=None):
+    for key, value in fields:
+        if key not in skip:
+            if schema and key in schema:
+                value = coerce(value, schema[key])
+            yield "field", {"name": key, "value": value}
+
+def _stream_llm(payload, cache, cache_key, repair=None, skip=(), schema=None):
+    """Stream one LLM call as ``(event, data)`` pairs.
+
+    Yields a "field" event per top-level field as soon as it is complete,
+    except for those in ``skip``, then "done" with the result (cached like
+    ``_call_llm``) or "error". Field values are coerced to ``schema``.
+    """
+    stream = FieldStream()
+    try:
+        response = get_client().stream(payload)
+        if response.status_code != 200:
+            yield "error", {"error": f"API request failed with status code {response.status_code}", "message": response.text}
+            return
+        for delta in iter_deltas(response):
+            yield from _field_events(stream.feed(delta), skip, schema)
+        parsed_data, remaining = stream.finish()
+    except requests.exceptions.RequestException as e:
+        yield "error", {"error": "Request failed", "message": str(e)}
+        return
+    except json.JSONDecodeError as e:
+        yield "error", {"error": "Failed to parse JSON after cleaning", "raw": stream.text, "message": str(e)}
+        return
+
+    yield from _field_events(remaining, skip, schema)
+    if repair:
+        repair(parsed_data)
+        # Fields filled in by the repair step
+        yield from _field_events(((key, value) for key, value in parsed_data.items() if key not in stream.emitted), skip)
+    cache.set(cache_key, parsed_data)
+    yield "done", parsed_data
+
+def _merge_chunks(results, cache, cache_key, repair=None):
+    """Merge per-chunk results into one, or return the first error"""
+    for result in results:
+        if "error" in result:
+            return result
+    parsed_data = merge_partials(results)
+    if repair:
+        repair(parsed_data)
+    if cache is not None:
+        cache.set(cache_key, parsed_data)
+    return parsed_data
+
+def _call_llm_chunks(payloads, cache, cache_key, repair=None):
+    # Chunks are extracted in parallel so long resumes take as long as their longest chunk.
+    results = map_chunks(lambda payload: _call_llm(payload, None, None), payloads)
+    return _merge_chunks(results, cache, cache_key, repair)
+
+async def _acall_llm_chunks(payloads, cache, cache_key, repair=None):
+    results = await asyncio.gather(*(_acall_llm(payload, None, None) for payload in payloads))
+    return _merge_chunks(results, cache, cache_key, repair)
+
+def _ats_cache_key(resume_data, model, fields):
+    return parse_cache.key(text_digest(resume_data), model or cascade.name, PROMPT_VERSION, ",".join(fields))
+
+def _ats_payloads(resume_data, model, fields):
+    # Contact-only selections never need the LLM
+    if not any(field in ATS_PROMPT_FIELDS for field in fields):
+        return []
+    prompt = build_prompt(ATS_PROMPT_HEAD, ATS_PROMPT_FIELDS, fields, ATS_PROMPT_TAIL)
+    # Each chunk gets whatever the model's context window has left over.
+    budget = prompt_budget(model, estimate_tokens(ATS_SYSTEM_PROMPT) + estimate_tokens(prompt))
+    return [
+        json_mode({
+            "model": model,
+            "messages": [
+                {"role": "system", "content": ATS_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt.format(resume_data=chunk)}
+            ],
+            "temperature": 0.2
+        })
+        for chunk in chunk_resume(resume_data, budget)
+    ]
+
+def _ats_repair(resume_data, fields):
+    schema = select_schema(ATS_SCHEMAS, fields)
+    # Contact fields come from regexes, not the LLM
+    contacts = extract_contacts(resume_data)
+    return lambda parsed_data: merge_contacts(conform(parsed_data, schema), contacts, fields)
+
+def _ats_confidence(resume_data):
+    return lambda parsed_data: resume_confidence(resume_data, parsed_data, ATS_CORE_KEYS)
+
+def _extract(resume_data, model, fields, cache_key):
+    repair = _ats_repair(resume_data, fields)
+    if not any(field in ATS_PROMPT_FIELDS for field in fields):
+        return _call_llm_chunks([], parse_cache, cache_key, repair=repair)
+    # Without a model, try the cheap tiers first and escalate on low confidence
+    parsed_data = cascade.run(
+        lambda tier: _call_llm_chunks(_ats_payloads(resume_data, tier, fields), None, None, repair=repair),
+        _ats_confidence(resume_data),
+        models=[model] if model else None,
+    )
+    if "error" not in parsed_data:
+        parse_cache.set(cache_key, parsed_data)
+    return parsed_data
+
+async def _aextract(resume_data, model, fields, cache_key):
+    repair = _ats_repair(resume_data, fields)
+    if not any(field in ATS_PROMPT_FIELDS for field in fields):
+        return await _acall_llm_chunks([], parse_cache, cache_key, repair=repair)
+    parsed_data = await cascade.arun(
+        lambda tier: _acall_llm_chunks(_ats_payloads(resume_data, tier, fields), None, None, repair=repair),
+        _ats_confidence(resume_data),
+        models=[model] if model else None,
+    )
+    if "error" not in parsed_data:
+        parse_cache.set(cache_key, parsed_data)
+    return parsed_data
+
+def ats_extractor(resume_data, model=None, fields=ATS_FIELDS):
+    """Parse ``resume_data``. Without a ``model``, the model cascade picks one."""
+    cache_key = _ats_cache_key(resume_data, model, fields)
+    cached = parse_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Identical resumes parsed concurrently share one LLM call.
+    return inflight.do(cache_key, _extract, resume_data, model, fields, cache_key)
+
+async def aats_extractor(resume_data, model=None, fields=ATS_FIELDS):
+    """Async variant of ats_extractor for ASGI views"""
+    cache_key = _ats_cache_key(resume_data, model, fields)
+    cached = parse_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    return await inflight.ado(cache_key, _aextract, resume_data, model, fields, cache_key)
+
+def ats_extractor_stream(resume_data, model=None, fields=ATS_FIELDS):
+    """Streaming variant of ats_extractor, yielding ``(event, data)`` pairs for SSE views
+
+    Fields already sent can't be taken back, so without a ``model`` the
+    stream skips the cascade and uses its most capable tier.
+    """
+    model = model or cascade.models[-1]
+    cache_key = _ats_cache_key(resume_data, model, fields)
+    cached = parse_cache.get(cache_key)
+    if cached is not None:
+        yield from _field_events(cached.items())
+        yield "done", cached
+        return
+
+    # Contact fields are ready before the LLM has even been called
+    ready = merge_contacts({}, extract_contacts(resume_data), fields)
+    yield from _field_events(ready.items())
+
+    payloads = _ats_payloads(resume_data, model, fields)
+    if len(payloads) == 1:
+        repair = _ats_repair(resume_data, fields)
+        schema = select_schema(ATS_SCHEMAS, fields)
+        yield from _stream_llm(payloads[0], parse_cache, cache_key, repair=repair, skip=ready, schema=schema)
+        return
+
+    # Nothing to stream: contacts only, or chunks extracted in parallel.
+    parsed_data = inflight.do(cache_key, _extract, resume_data, model, fields, cache_key)
+    if "error" in parsed_data:
+        yield "error", parsed_data
+        return
+    yield from _field_events(parsed_data.items(), skip=ready)
+    yield "done", parsed_data
+
+def _fill_match_defaults(parsed_data):
+    # Validate against the schema: missing scores become 0, missing lists [],
+    # and values of the wrong type are coerced
+    conform(parsed_data, MATCH_SCHEMA)
+
+def _match_request(resume_data, job_description, model, mode, local=None):
+    cache_key = match_cache.key(
+        json_digest(resume_data), text_digest(job_description), model, MATCH_PROMPT_VERSION, mode
+    )
+    resume_json = json.dumps(resume_data, indent=2)
+    if local is None:
+        template, missing_keywords = MATCH_PROMPT, ""
+    else:
+        template, missing_keywords = IMPROVEMENTS_PROMPT, ", ".join(local["missingKeywords"]) or "none"
+    # The job description gets whatever room the template and resume leave.
+    overhead = (
+        estimate_tokens(MATCH_SYSTEM_PROMPT) + estimate_tokens(template)
+        + estimate_tokens(resume_json) + estimate_tokens(missing_keywords)
+    )
+    job_description = truncate_to_tokens(job_description, prompt_budget(model, overhead))
+    prompt = template.format(resume_data=resume_json, job_description=job_description, missing_keywords=missing_keywords)
+    payload = json_mode({
         "model": model,
         "messages": [
-            {"role": "system", "content": "You are an expert HR professional that analyzes resume-job matches and provides detailed scoring and recommendations."},
-            {"role": "user", "content": prompt.format(resume_data=json.dumps(resume_data, indent=2), job_description=job_description)}
+            {"role": "system", "content": MATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
         ],
         "temperature": 0.1
-    }
+    })
+    return cache_key, payload
 
-    try:
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content'].strip()
-
-            # Try to isolate valid JSON block using regex
-            match = re.search(r"\{[\s\S]*\}", content)
-            if match:
-                json_string = clean_json_string(match.group())
-
-                try:
-                    parsed_data = json.loads(json_string)
-                    
-                    # Validate and ensure all required fields are present
-                    required_fields = ['overallMatch', 'skillsMatch', 'experienceMatch', 'educationMatch', 'missingKeywords', 'recommendedImprovements']
-                    for field in required_fields:
-                        if field not in parsed_data:
-                            if field in ['overallMatch', 'skillsMatch', 'experienceMatch', 'educationMatch']:
-                                parsed_data[field] = 0  # Default to 0 for missing scores
-                            elif field in ['missingKeywords', 'recommendedImprovements']:
-                                parsed_data[field] = []  # Default to empty array for missing lists
-                    
-                    return parsed_data
-                except json.JSONDecodeError as e:
-                    return {"error": "Failed to parse JSON after cleaning", "raw": json_string, "message": str(e)}
-            else:
-                return {"error": "No valid JSON object found", "raw": content}
-
-        else:
-            return {"error": f"API request failed with status code {response.status_code}", "message": response.text}
+def _match_repair(local):
+    if local is None:
+        return _fill_match_defaults
 
-    except requests.exceptions.RequestException as e:
-        return {"error": "Request failed", "message": str(e)}
+    def repair(parsed_data):
+        # Keep only the LLM's advice; the scores are the local ones
+        improvements = conform(parsed_data, IMPROVEMENTS_SCHEMA)["recommendedImprovements"]
+        parsed_data.clear()
+        parsed_data.update(local, recommendedImprovements=improvements)
+    return repair
 
-    except json.JSONDecodeError:
-        return {"error": "Failed to parse JSON from response", "raw": response.text}
-    
+def _match_result(result, local):
+    # Without the LLM's advice the local scores still stand
+    if local is not None and "error" in result:
+        return local
+    return result
+
+def match_analyzer(resume_data, job_description, model="llama3-70b-8192", mode=MATCH_MODE):
+    """Score ``resume_data`` against ``job_description``.
+
+    ``mode`` is one of ``resume_utils.keywords.MATCH_MODES``: "llm" has the LLM do
+    the whole analysis, "hybrid" only asks it for the recommended
+    improvements, and "fast" never calls it.
+    """
+    if mode == "fast":
+        return keyword_match(resume_data, job_description)
+    local = keyword_match(resume_data, job_description) if mode == "hybrid" else None
+    cache_key, payload = _match_request(resume_data, job_description, model, mode, local)
+    cached = match_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = inflight.do(cache_key, _call_llm, payload, match_cache, cache_key, repair=_match_repair(local), route="match")
+    return _match_result(result, local)
+
+async def amatch_analyzer(resume_data, job_description, model="llama3-70b-8192", mode=MATCH_MODE):
+    """Async variant of match_analyzer for ASGI views"""
+    if mode == "fast":
+        return keyword_match(resume_data, job_description)
+    local = keyword_match(resume_data, job_description) if mode == "hybrid" else None
+    cache_key, payload = _match_request(resume_data, job_description, model, mode, local)
+    cached = match_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = await inflight.ado(cache_key, _acall_llm, payload, match_cache, cache_key, repair=_match_repair(local))
+    return _match_result(result, local)
+
+def match_analyzer_stream(resume_data, job_description, model="llama3-70b-8192", mode=MATCH_MODE):
+    """Streaming variant of match_analyzer, yielding ``(event, data)`` pairs for SSE views
+
+    In hybrid mode the local scores come first, then the LLM's recommendations.
+    """
+    if mode == "fast":
+        match_data = keyword_match(resume_data, job_description)
+        yield from _field_events(match_data.items())
+        yield "done", match_data
+        return
+    local = keyword_match(resume_data, job_description) if mode == "hybrid" else None
+    cache_key, payload = _match_request(resume_data, job_description, model, mode, local)
+    cached = match_cache.get(cache_key)
+    if cached is not None:
+        yield from _field_events(cached.items())
+        yield "done", cached
+        return
+
+    if local is None:
+        yield from _stream_llm(payload, match_cache, cache_key, repair=_fill_match_defaults, schema=MATCH_SCHEMA)
+        return
+
+    scores = {key: value for key, value in local.items() if key not in IMPROVEMENTS_SCHEMA}
+    yield from _field_events(scores.items())
+    for event, data in _stream_llm(payload, match_cache, cache_key, repair=_match_repair(local), skip=scores, schema=IMPROVEMENTS_SCHEMA):
+        if event == "error":
+            # Fall back to the local recommendations, as match_analyzer does
+            yield from _field_events([("recommendedImprovements", local["recommendedImprovements"])])
+            event, data = "done", local
+        yield event, data
 
+_rerank_executor = ThreadPoolExecutor(max_workers=RANK_RERANK_WORKERS, thread_name_prefix="llm-rerank")
 
+def rerank_matches(resumes, job_description, model="llama3-70b-8192"):
+    """LLM match analyses of several resumes against one job description, in parallel
 
+    Returns the analyses in the order of ``resumes``.
+    """
+    return list(_rerank_executor.map(
+        lambda resume_data: match_analyzer(resume_data, job_description, model, mode="llm"), resumes
+    ))
@@ -5,4 +5,11 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('process/', views.process_resume, name='process_resume'),
     path('match/', views.match_analysis, name='match_analysis'),
+    path('rank/', views.rank_resumes, name='rank_resumes'),
+    path('async/process/', views.process_resume_async, name='process_resume_async'),
+    path('async/match/', views.match_analysis_async, name='match_analysis_async'),
+    path('stream/process/', views.process_resume_stream, name='process_resume_stream'),
+    path('stream/match/', views.match_analysis_stream, name='match_analysis_stream'),
+    path('match/batch/', views.match_analysis_batch, name='match_analysis_batch'),
+    path('stats/', views.stats, name='stats'),
 ] 
\ No newline at end of file
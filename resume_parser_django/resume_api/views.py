@@ -1,15 +1,44 @@
+import functools
+import json
+import logging
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DatabaseError
+from django.db.models import Count, Max
 from django.shortcuts import render
-import os
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from rest_framework.decorators import api_view, parser_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from pypdf import PdfReader
-from .resume_parser import ats_extractor, match_analyzer
-from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .resume_parser import (
+    ATS_FIELDS, aats_extractor, amatch_analyzer, ats_extractor, ats_extractor_stream, match_analyzer,
+    match_analyzer_stream, rerank_matches,
+)
+from .models import ParsedResume
+from resume_utils.batch import batch_events, parse_job_descriptions
+from resume_utils.cascade import cascade
+from resume_utils.cassette import cassette
+from resume_utils.fields import parse_fields
+from resume_utils.keywords import keyword_stats, parse_mode
+from resume_utils.llm import get_client
+from resume_utils.llmcache import match_cache, parse_cache
+from resume_utils.pdftext import read_pdf_upload, text_cache
+from resume_utils.ranking import RANK_MAX_RESULTS, RANK_RERANK_MAX, resume_index
+from resume_utils.ratelimit import limiter
+from resume_utils.schema import schema_stats
+from resume_utils.sections import compaction_stats
+from resume_utils.tokens import token_usage
+from resume_utils.singleflight import inflight
+from resume_utils.sse import NDJSON_CONTENT_TYPE, SSE_CONTENT_TYPE, SSE_HEADERS, ndjson_stream, parse_format, sse_stream
+
+logger = logging.getLogger(__name__)
 
 
 @api_view(['GET'])
@@ -18,6 +47,66 @@ def index(request):
     return Response({"message": "Resume Parser API is running."}, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+def stats(request):
+    """Counters for the in-process caches and the LLM scheduler"""
+    return Response({
+        "pdf_text": text_cache.stats(),
+        "llm_parse": parse_cache.stats(),
+        "llm_match": match_cache.stats(),
+        "llm_rate_limit": limiter.stats(),
+        "llm_hedging": get_client().hedge_policy.stats(),
+        "llm_singleflight": inflight.stats(),
+        "prompt_compaction": compaction_stats.stats(),
+        "llm_tokens": token_usage.stats(),
+        "llm_schema": schema_stats.stats(),
+        "llm_cascade": cascade.stats(),
+        "keyword_match": keyword_stats.stats(),
+        "resume_ranking": resume_index.stats(),
+        "llm_cassette": cassette.stats() if cassette is not None else None,
+    }, status=status.HTTP_200_OK)
+
+
+def _selected_fields(query, form):
+    """Fields picked with ?fields=skills,email or a form field of the same name"""
+    return parse_fields(query.getlist('fields') + form.getlist('fields'), ATS_FIELDS)
+
+
+def _with_resume_id(resume_text, parsed_data, fields, user):
+    """Store a full parse and add its ``resume_id``, for ranking and the match endpoints
+
+    Only signed-in users' parses are stored. A partial parse would overwrite
+    the full one, so it isn't stored either.
+    """
+    if fields != ATS_FIELDS or "error" in parsed_data:
+        return parsed_data
+    try:
+        resume = ParsedResume.store(resume_text, parsed_data, user)
+    except DatabaseError:
+        # The parse still stands; it just can't be reused
+        logger.exception("Failed to store parsed resume")
+        return parsed_data
+    if resume is None:
+        return parsed_data
+    return {**parsed_data, "resume_id": resume.content_hash}
+
+
+def _match_resume(data, user):
+    """The parsed resume of a match request: ``resume_data`` or a stored ``resume_id``
+
+    Raises ``ValueError`` if there is neither and ``LookupError`` for an unknown ID.
+    """
+    if data.get('resume_data'):
+        return data['resume_data']
+    resume_id = data.get('resume_id')
+    if not resume_id:
+        raise ValueError("resume_data or resume_id is required")
+    resume_data = ParsedResume.lookup(resume_id, user)
+    if resume_data is None:
+        raise LookupError("Unknown resume_id; upload the resume again")
+    return resume_data
+
+
 @api_view(['POST'])
 @parser_classes([MultiPartParser, FormParser])
 def process_resume(request):
@@ -47,48 +136,30 @@ def process_resume(request):
         )
     
     try:
-        # Create media directory if it doesn't exist
-        media_dir = os.path.join(settings.MEDIA_ROOT, 'resumes')
-        os.makedirs(media_dir, exist_ok=True)
-        
-        # Save the uploaded file
-        file_path = os.path.join(media_dir, 'temp_resume.pdf')
-        with open(file_path, 'wb+') as destination:
-            for chunk in uploaded_file.chunks():
-                destination.write(chunk)
-        
-        # Read the PDF file
-        data = _read_file_from_path(file_path)
+        fields = _selected_fields(request.query_params, request.data)
+    except ValueError as e:
+        return Response(
+            {"error": str(e)}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        # Read the PDF straight from the upload
+        data = read_pdf_upload(uploaded_file)
         
         # Parse the resume
-        parsed_data = ats_extractor(data)
-        
-        # Clean up the temporary file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        parsed_data = ats_extractor(data, fields=fields)
+        parsed_data = _with_resume_id(data, parsed_data, fields, request.user)
         
         return Response(parsed_data, status=status.HTTP_200_OK)
         
     except Exception as e:
-        # Clean up the temporary file in case of error
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
-        
         return Response(
             {"error": "Failed to process file", "message": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
-def _read_file_from_path(path):
-    """Extract text from PDF file"""
-    reader = PdfReader(path)
-    data = ""
-    for page in reader.pages:
-        data += page.extract_text()
-    return data
-
-
 @api_view(['POST'])
 @parser_classes([JSONParser])
 def match_analysis(request):
@@ -98,17 +169,39 @@ def match_analysis(request):
         data = request.data
         
         # Validate required fields
-        if 'resume_data' not in data or 'job_description' not in data:
+        if 'job_description' not in data:
             return Response(
-                {"error": "Both resume_data and job_description are required"}, 
+                {"error": "job_description is required"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        resume_data = data['resume_data']
         job_description = data['job_description']
         
+        # The resume itself, or the resume_id of one processed before
+        try:
+            resume_data = _match_resume(data, request.user)
+        except ValueError as e:
+            return Response(
+                {"error": str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except LookupError as e:
+            return Response(
+                {"error": str(e)}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # Optional mode: llm, hybrid or fast (no LLM call)
+        try:
+            mode = parse_mode(data.get('mode'))
+        except ValueError as e:
+            return Response(
+                {"error": str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         # Perform match analysis using LLM
-        match_result = match_analyzer(resume_data, job_description)
+        match_result = match_analyzer(resume_data, job_description, mode=mode)
         
         return Response(match_result, status=status.HTTP_200_OK)
         
@@ -117,3 +210,334 @@ def match_analysis(request):
             {"error": "Failed to analyze match", "message": str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+
+
+@api_view(['POST'])
+@parser_classes([JSONParser])
+@permission_classes([IsAuthenticated])
+def rank_resumes(request):
+    """Rank the user's stored resumes against a job description"""
+    data = request.data
+    job_description = data.get('job_description')
+    if not isinstance(job_description, str) or not job_description.strip():
+        return Response(
+            {"error": "job_description is required"}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        k = int(data.get('k', 50))
+        if not 1 <= k <= RANK_MAX_RESULTS:
+            raise ValueError
+    except (TypeError, ValueError):
+        return Response(
+            {"error": f"k must be a number from 1 to {RANK_MAX_RESULTS}"}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        # One sparse product scores them all; the user's index is rebuilt
+        # only when they added, changed or deleted resumes since the last ranking
+        resumes = ParsedResume.objects.current().filter(user=request.user)
+        stamp = resumes.aggregate(count=Count('pk'), latest=Max('updated_at'))
+        ranked = resume_index.rank(
+            request.user.pk,
+            (stamp['count'], stamp['latest']),
+            lambda: resumes.values_list('pk', 'terms').iterator(),
+            job_description,
+            k,
+        )
+        stored = ParsedResume.objects.in_bulk([pk for pk, _ in ranked])
+        results = [
+            {
+                "resume_id": stored[pk].content_hash,
+                "score": round(100 * score, 1),
+                "resume": stored[pk].data,
+            }
+            for pk, score in ranked if pk in stored
+        ]
+        
+        # Optionally let the LLM matcher reorder the best few
+        if data.get('rerank'):
+            top = results[:RANK_RERANK_MAX]
+            for result, match in zip(top, rerank_matches([result["resume"] for result in top], job_description)):
+                result["match"] = match
+            top.sort(key=lambda result: result["match"].get("overallMatch", -1), reverse=True)
+            results[:len(top)] = top
+        
+        return Response({"results": results}, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response(
+            {"error": "Failed to rank resumes", "message": str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+def _authenticate(request):
+    # Same JWT-only authentication as the DRF views. The session is never
+    # consulted: these views are csrf_exempt and CORS allows credentials,
+    # so any site could otherwise act with a signed-in visitor's cookie.
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed as e:
+        # The body DRF's exception handler would send
+        detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+        return JsonResponse(detail, status=e.status_code)
+    request.user = authenticated[0] if authenticated is not None else AnonymousUser()
+    return None
+
+
+def jwt_authenticated(view):
+    """Authenticate a plain Django view the way the DRF views are, so
+    ``request.user`` is the API client's user rather than anonymous
+
+    A bad token gets the same 401 as from a DRF view.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            rejected = await sync_to_async(_authenticate)(request)
+            if rejected is not None:
+                return rejected
+            return await view(request, *args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            rejected = _authenticate(request)
+            if rejected is not None:
+                return rejected
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+# Async variants, for deployments served under ASGI. They hold no worker
+# thread while waiting on the LLM, so one process can keep many calls in
+# flight. DRF views are sync-only, so these are plain Django views, with
+# DRF's JWT authentication applied by ``jwt_authenticated``.
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_authenticated
+async def process_resume_async(request):
+    """Async version of process_resume"""
+    uploaded_file = request.FILES.get('pdf_doc')
+    if uploaded_file is None:
+        return JsonResponse({"error": "No file part"}, status=400)
+    if uploaded_file.name == '':
+        return JsonResponse({"error": "No selected file"}, status=400)
+    if not uploaded_file.name.lower().endswith('.pdf'):
+        return JsonResponse({"error": "File must be a PDF"}, status=400)
+    try:
+        fields = _selected_fields(request.GET, request.POST)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        # PDF extraction is CPU-bound, keep it off the event loop
+        data = await sync_to_async(read_pdf_upload, thread_sensitive=False)(uploaded_file)
+        parsed_data = await aats_extractor(data, fields=fields)
+        parsed_data = await sync_to_async(_with_resume_id)(data, parsed_data, fields, request.user)
+        return JsonResponse(parsed_data)
+    except Exception as e:
+        return JsonResponse({"error": "Failed to process file", "message": str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_authenticated
+async def match_analysis_async(request):
+    """Async version of match_analysis"""
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({"error": "Request body must be JSON"}, status=400)
+
+    if not isinstance(data, dict) or 'job_description' not in data:
+        return JsonResponse({"error": "job_description is required"}, status=400)
+
+    try:
+        mode = parse_mode(data.get('mode'))
+        resume_data = await sync_to_async(_match_resume)(data, request.user)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except LookupError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+
+    try:
+        match_result = await amatch_analyzer(resume_data, data['job_description'], mode=mode)
+        return JsonResponse(match_result)
+    except Exception as e:
+        return JsonResponse({"error": "Failed to analyze match", "message": str(e)}, status=500)
+
+
+# Streaming variants: Server-Sent Events with a "field" event per top-level
+# field as soon as the LLM has written it, then "done" with the full result.
+# Django buffers a sync iterator under ASGI, so there the events are handed
+# over as an async iterator instead.
+
+async def _aiter(iterator):
+    """``iterator`` as an async iterator, each step run in a worker thread"""
+    step = sync_to_async(next, thread_sensitive=False)
+    done = object()
+    try:
+        while (item := await step(iterator, done)) is not done:
+            yield item
+    finally:
+        # Closing the events cancels the work not yet started (see batch).
+        await sync_to_async(iterator.close, thread_sensitive=False)()
+
+
+def _streaming_response(request, body, content_type):
+    if isinstance(request, ASGIRequest):
+        body = _aiter(body)
+    response = StreamingHttpResponse(body, content_type=content_type)
+    for header, value in SSE_HEADERS.items():
+        response[header] = value
+    return response
+
+
+def _sse_response(request, events):
+    return _streaming_response(request, sse_stream(events), SSE_CONTENT_TYPE)
+
+
+def _ndjson_response(request, events):
+    return _streaming_response(request, ndjson_stream(events), NDJSON_CONTENT_TYPE)
+
+
+def _stored_events(events, resume_text, fields, user):
+    for event, data in events:
+        if event == "done":
+            data = _with_resume_id(resume_text, data, fields, user)
+        yield event, data
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_authenticated
+def process_resume_stream(request):
+    """Streaming version of process_resume"""
+    uploaded_file = request.FILES.get('pdf_doc')
+    if uploaded_file is None:
+        return JsonResponse({"error": "No file part"}, status=400)
+    if uploaded_file.name == '':
+        return JsonResponse({"error": "No selected file"}, status=400)
+    if not uploaded_file.name.lower().endswith('.pdf'):
+        return JsonResponse({"error": "File must be a PDF"}, status=400)
+    try:
+        fields = _selected_fields(request.GET, request.POST)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        data = read_pdf_upload(uploaded_file)
+    except Exception as e:
+        return JsonResponse({"error": "Failed to process file", "message": str(e)}, status=500)
+    return _sse_response(request, _stored_events(ats_extractor_stream(data, fields=fields), data, fields, request.user))
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_authenticated
+def match_analysis_stream(request):
+    """Streaming version of match_analysis"""
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({"error": "Request body must be JSON"}, status=400)
+
+    if not isinstance(data, dict) or 'job_description' not in data:
+        return JsonResponse({"error": "job_description is required"}, status=400)
+
+    try:
+        mode = parse_mode(data.get('mode'))
+        resume_data = _match_resume(data, request.user)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except LookupError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+
+    return _sse_response(request, match_analyzer_stream(resume_data, data['job_description'], mode=mode))
+
+
+def _batch_request(request):
+    """Parameters of a batch match, from a JSON body or a multipart form
+
+    The resume is a ``resume_id``, parsed ``resume_data`` or a ``pdf_doc``.
+    Returns ``(resume_text, resume_data, job_descriptions, mode, format)``;
+    one of ``resume_text`` and ``resume_data`` is None. Raises
+    ``ValueError`` for a bad request and ``LookupError`` for an unknown ID.
+    """
+    if request.content_type == 'application/json':
+        try:
+            values = json.loads(request.body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise ValueError("Request body must be JSON")
+        if not isinstance(values, dict):
+            raise ValueError("Request body must be a JSON object")
+        resume_data, job_descriptions = values.get('resume_data'), values.get('job_descriptions')
+    else:
+        values = request.POST
+        resume_data = values.get('resume_data')
+        if resume_data:
+            try:
+                resume_data = json.loads(resume_data)
+            except json.JSONDecodeError:
+                raise ValueError("resume_data must be JSON")
+        job_descriptions = values.getlist('job_descriptions')
+
+    mode = parse_mode(values.get('mode'))
+    stream_format = parse_format(values.get('format'))
+    job_descriptions = parse_job_descriptions(job_descriptions)
+    if resume_data:
+        if not isinstance(resume_data, dict):
+            raise ValueError("resume_data must be a JSON object")
+        return None, resume_data, job_descriptions, mode, stream_format
+    if values.get('resume_id'):
+        return None, _match_resume(values, request.user), job_descriptions, mode, stream_format
+    uploaded_file = request.FILES.get('pdf_doc')
+    if uploaded_file is None or uploaded_file.name == '':
+        raise ValueError("Missing file or resume data")
+    if not uploaded_file.name.lower().endswith('.pdf'):
+        raise ValueError("File must be a PDF")
+    return read_pdf_upload(uploaded_file), None, job_descriptions, mode, stream_format
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@jwt_authenticated
+def match_analysis_batch(request):
+    """Match one resume against many job descriptions, streaming each result as it completes
+
+    Takes a ``resume_id``, parsed ``resume_data`` or a ``pdf_doc``, and a
+    list of ``job_descriptions``; an uploaded resume is parsed once. Streams a "resume"
+    event with the parse (when a file was sent), a "match" event per job
+    description in completion order, then "done", as NDJSON (default) or,
+    with ``format=sse``, Server-Sent Events.
+    """
+    try:
+        resume_text, resume_data, job_descriptions, mode, stream_format = _batch_request(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except LookupError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    except Exception as e:
+        return JsonResponse({"error": "Failed to process file", "message": str(e)}, status=500)
+
+    def events():
+        parsed_data = resume_data
+        if parsed_data is None:
+            parsed_data = ats_extractor(resume_text)
+            if "error" in parsed_data:
+                yield "error", parsed_data
+                return
+            # The ID is for the client; kept out of the match, it can't end
+            # up in the prompt or split the match cache by user.
+            yield "resume", _with_resume_id(resume_text, parsed_data, ATS_FIELDS, request.user)
+        yield from batch_events(
+            lambda job_description: match_analyzer(parsed_data, job_description, mode=mode), job_descriptions
+        )
+
+    return _sse_response(request, events()) if stream_format == "sse" else _ndjson_response(request, events())
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -21,6 +22,10 @@ load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# The utils shared with the Flask backend (resume_utils) live at the
+# repository root.
+sys.path.insert(0, str(BASE_DIR.parent))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -181,3 +186,6 @@ AUTH_USER_MODEL = 'users.User'
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+
+# Parsed resumes kept for ranking and resume_id reuse (authenticated users only)
+PARSED_RESUME_RETENTION_DAYS = int(os.getenv("PARSED_RESUME_RETENTION_DAYS", 30))
@@ -0,0 +1,12 @@
+"""
+Parsing, matching and LLM plumbing shared by the Flask backend
+(``backend/``) and the Django project (``resume_parser_django/``).
+
+Both put the repository root on ``sys.path`` and import this package from
+there: the Flask app in ``backend/app.py``, the Django project in its
+settings.
+"""
+from dotenv import load_dotenv
+
+# Settings below are read from the environment at import time.
+load_dotenv()
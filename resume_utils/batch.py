@@ -0,0 +1,84 @@
+"""
+Batch matching: one resume against many job descriptions.
+
+Candidates compare a handful of postings at once. Rather than one request
+(and one resume parse) per posting, the batch endpoints parse the resume
+once and run the per-posting analyses on a shared thread pool, at most
+``MATCH_BATCH_CONCURRENCY`` of them in flight per request, streaming each
+result as soon as it completes. A slow analysis never holds back the
+ones behind it; the ``index`` in each result says which posting it is for.
+
+Settings (environment variables):
+    MATCH_BATCH_MAX_JOBS     job descriptions accepted per request (default: 20)
+    MATCH_BATCH_CONCURRENCY  analyses in flight per request (default: 4)
+    MATCH_BATCH_WORKERS      threads shared by all batch requests (default: 32)
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+MATCH_BATCH_MAX_JOBS = int(os.getenv("MATCH_BATCH_MAX_JOBS", 20))
+MATCH_BATCH_CONCURRENCY = int(os.getenv("MATCH_BATCH_CONCURRENCY", 4))
+MATCH_BATCH_WORKERS = int(os.getenv("MATCH_BATCH_WORKERS", 32))
+
+_executor = ThreadPoolExecutor(max_workers=MATCH_BATCH_WORKERS, thread_name_prefix="match-batch")
+
+
+def parse_job_descriptions(values, max_jobs=MATCH_BATCH_MAX_JOBS):
+    """The job descriptions of a batch request, as a list of strings.
+
+    Raises ``ValueError`` unless ``values`` is a list of 1 to ``max_jobs``
+    non-empty strings.
+    """
+    if not isinstance(values, list) or not values:
+        raise ValueError("job_descriptions must be a non-empty list")
+    if len(values) > max_jobs:
+        raise ValueError(f"At most {max_jobs} job descriptions per request")
+    if not all(isinstance(value, str) and value.strip() for value in values):
+        raise ValueError("Every job description must be a non-empty string")
+    return values
+
+
+def imap_completed(fn, items, limit=MATCH_BATCH_CONCURRENCY):
+    """Yield ``(index, fn(item))`` for ``items``, in the order the calls finish.
+
+    At most ``limit`` calls run at once; the next one starts when one
+    finishes. Closing the generator cancels the calls not yet started.
+    """
+    queue = iter(enumerate(items))
+    pending = {}
+
+    def submit():
+        for index, item in queue:
+            pending[_executor.submit(fn, item)] = index
+            return
+
+    try:
+        for _ in range(max(1, limit)):
+            submit()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                submit()
+                yield index, future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def batch_events(match, job_descriptions, limit=MATCH_BATCH_CONCURRENCY):
+    """``(event, data)`` pairs for a batch match stream.
+
+    A ``"match"`` event with ``{"index": i, "match": match(job_descriptions[i])}``
+    per job description as its analysis completes, then ``"done"``. An
+    analysis that raises gets an error result; the others carry on.
+    """
+    def analyze(job_description):
+        try:
+            return match(job_description)
+        except Exception as e:
+            return {"error": "Failed to analyze match", "message": str(e)}
+
+    for index, result in imap_completed(analyze, job_descriptions, limit):
+        yield "match", {"index": index, "match": result}
+    yield "done", {"count": len(job_descriptions)}
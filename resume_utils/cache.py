@@ -0,0 +1,246 @@
+"""
+Small cache building blocks shared by the Flask and Django backends.
+
+Every cache exposes the same ``get``/``set``/``stats`` interface so the
+callers don't care which tier or backend answers.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache bounded by the total size of its values.
+
+    ``sizeof`` measures a value; the default counts entries, so ``max_size``
+    is then simply the maximum number of entries. Entries older than ``ttl``
+    seconds, if given, are treated as missing.
+    """
+
+    def __init__(self, max_size, sizeof=None, ttl=None):
+        self.max_size = max_size
+        self.sizeof = sizeof or (lambda value: 1)
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.monotonic():
+                self._size -= self._data.pop(key)[1]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_size:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._size -= self._data.pop(key)[1]
+            self._data[key] = (value, size, expires)
+            self._size += size
+            while self._size > self.max_size:
+                _, (_, evicted_size, _) = self._data.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "size": self._size,
+                "max_size": self.max_size,
+            }
+
+
+class DirectoryCache:
+    """On-disk cache storing one text file per key under ``path``."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.txt")
+
+    def get(self, key, default=None):
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                value = f.read()
+        except OSError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        # Write to a temp file first so readers never see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(value)
+            os.replace(tmp_path, self._file(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "path": self.path}
+
+
+class TieredCache:
+    """A fast cache in front of an optional slower one.
+
+    Hits in the slower tier are copied into the fast tier.
+    """
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def stats(self):
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+
+class SQLiteCache:
+    """Persistent cache in a single SQLite file, with TTL and LRU eviction.
+
+    Values must be strings. Useful when several worker processes on one host
+    should share results.
+    """
+
+    def __init__(self, path, max_entries, ttl=None, table="cache"):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT, expires REAL, accessed REAL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT value, expires FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                self.misses += 1
+                return default
+            self._conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, expires, now),
+            )
+            self._conn.execute(f"DELETE FROM {self.table} WHERE expires < ?", (now,))
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "path": self.path}
+
+
+class DjangoCache:
+    """Adapter over a Django cache alias; Django handles TTL and culling."""
+
+    def __init__(self, alias="default", ttl=None, prefix=""):
+        from django.core.cache import caches
+
+        self._cache = caches[alias]
+        self.alias = alias
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        value = self._cache.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._cache.set(self.prefix + key, value, timeout=self.ttl)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "alias": self.alias}
+
+
+def make_cache(backend, max_entries, ttl=None, path=None, name="cache"):
+    """Build a string-valued cache from a backend name.
+
+    ``backend`` is one of ``memory``, ``sqlite`` (stored at ``path``) or
+    ``django`` (the ``default`` cache alias).
+    """
+    if backend == "memory":
+        return LRUCache(max_entries, ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteCache(path, max_entries, ttl=ttl, table=name)
+    if backend == "django":
+        return DjangoCache(ttl=ttl, prefix=f"{name}:")
+    raise ValueError(f"Unknown cache backend: {backend}")
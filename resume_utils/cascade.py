@@ -0,0 +1,180 @@
+"""
+Tiered model cascade for resume parsing.
+
+Most resumes are short and cleanly extracted, and a small model parses
+them as well as a large one in a fraction of the time. ``Cascade.run``
+tries the tiers from cheapest to most capable and keeps the first result
+whose confidence clears a threshold. Failed calls and unparseable replies
+always escalate, and the last tier's answer is final. Per-tier hit rates
+and latencies are kept for the stats endpoints.
+
+Settings (environment variables):
+    LLM_CASCADE_MODELS          comma-separated tiers, cheapest first
+                                (default: llama-3.1-8b-instant,llama3-70b-8192);
+                                a single model disables the cascade
+    LLM_CASCADE_MIN_CONFIDENCE  confidence needed to accept an early tier
+                                (default: 0.75)
+"""
+import os
+import re
+import threading
+import time
+
+from .contacts import find_dates
+from .skills import get_skill_index
+
+LLM_CASCADE_MODELS = [
+    model.strip()
+    for model in os.getenv("LLM_CASCADE_MODELS", "llama-3.1-8b-instant,llama3-70b-8192").split(",")
+    if model.strip()
+]
+LLM_CASCADE_MIN_CONFIDENCE = float(os.getenv("LLM_CASCADE_MIN_CONFIDENCE", 0.75))
+
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _filled(value):
+    return value not in (None, "", [], {})
+
+
+def _strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+
+
+def resume_confidence(resume_text, parsed_data, core_keys):
+    """Heuristic 0-1 confidence that ``parsed_data`` is a faithful parse.
+
+    Averages the checks that apply:
+
+    - the ``core_keys`` (fields every resume has) are filled in;
+    - every word of the name appears in the resume;
+    - most listed skills appear in the resume, under any of their spellings,
+      since small models invent them;
+    - the years in the result appear in the resume, and most of the resume's
+      years made it into the result, so dates are neither made up nor dropped.
+    """
+    text = resume_text.casefold()
+    checks = []
+
+    present = [key for key in core_keys if key in parsed_data]
+    if present:
+        checks.append(sum(_filled(parsed_data[key]) for key in present) / len(present))
+
+    name = parsed_data.get("name")
+    if isinstance(name, str) and name.strip():
+        words = _WORD_RE.findall(name.casefold())
+        checks.append(float(all(word in text for word in words)))
+
+    skills = parsed_data.get("skills")
+    if isinstance(skills, list) and skills:
+        index = get_skill_index()
+        mentioned = set(index.skills(resume_text))
+        found = sum(
+            skill.casefold() in text or index.canonical(skill) in mentioned
+            for skill in skills if isinstance(skill, str)
+        )
+        checks.append(found / len(skills))
+
+    text_years = {year for date in find_dates(resume_text) for year in _YEAR_RE.findall(date)}
+    result_years = {
+        year
+        for key, value in parsed_data.items() if key != "summary"
+        for string in _strings(value)
+        for year in _YEAR_RE.findall(string)
+    }
+    if result_years:
+        checks.append(len(result_years & text_years) / len(result_years))
+    if text_years and any(_filled(parsed_data.get(key)) for key in present):
+        # Half the years is plenty; some are certificates or hobbies.
+        checks.append(min(1.0, 2 * len(result_years & text_years) / len(text_years)))
+
+    return sum(checks) / len(checks) if checks else 1.0
+
+
+class Cascade:
+    def __init__(self, models=LLM_CASCADE_MODELS, min_confidence=LLM_CASCADE_MIN_CONFIDENCE):
+        self.models = list(models)
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._tiers = {model: {"calls": 0, "accepted": 0, "seconds": 0.0} for model in self.models}
+        self.requests = 0
+
+    @property
+    def name(self):
+        """Identifies the tier list, e.g. for cache keys."""
+        return "+".join(self.models)
+
+    def _record(self, model, seconds, accepted):
+        with self._lock:
+            tier = self._tiers.setdefault(model, {"calls": 0, "accepted": 0, "seconds": 0.0})
+            tier["calls"] += 1
+            tier["seconds"] += seconds
+            if accepted:
+                tier["accepted"] += 1
+
+    def _settle(self, model, last, started, result, score):
+        confidence = 0.0 if "error" in result else score(result)
+        accepted = last or confidence >= self.min_confidence
+        self._record(model, time.monotonic() - started, accepted)
+        return confidence, accepted
+
+    def run(self, attempt, score, models=None):
+        """Return ``attempt(model)`` for the first tier whose result scores high enough.
+
+        ``score(result)`` gives a 0-1 confidence; results with an ``"error"``
+        key score 0. If the last tier fails, the best earlier result is
+        returned rather than the error.
+        """
+        models = models or self.models
+        with self._lock:
+            self.requests += 1
+        best, best_confidence = None, -1.0
+        for index, model in enumerate(models):
+            started = time.monotonic()
+            result = attempt(model)
+            last = index == len(models) - 1
+            confidence, accepted = self._settle(model, last, started, result, score)
+            if "error" not in result and confidence > best_confidence:
+                best, best_confidence = result, confidence
+            if accepted:
+                return best if "error" in result and best is not None else result
+
+    async def arun(self, attempt, score, models=None):
+        """Async version of ``run`` for coroutine ``attempt`` functions."""
+        models = models or self.models
+        with self._lock:
+            self.requests += 1
+        best, best_confidence = None, -1.0
+        for index, model in enumerate(models):
+            started = time.monotonic()
+            result = await attempt(model)
+            last = index == len(models) - 1
+            confidence, accepted = self._settle(model, last, started, result, score)
+            if "error" not in result and confidence > best_confidence:
+                best, best_confidence = result, confidence
+            if accepted:
+                return best if "error" in result and best is not None else result
+
+    def stats(self):
+        with self._lock:
+            tiers = {
+                model: {
+                    "calls": tier["calls"],
+                    "accepted": tier["accepted"],
+                    "hit_rate": round(tier["accepted"] / tier["calls"], 3) if tier["calls"] else 0.0,
+                    "avg_latency": round(tier["seconds"] / tier["calls"], 3) if tier["calls"] else 0.0,
+                }
+                for model, tier in self._tiers.items()
+            }
+            return {"requests": self.requests, "min_confidence": self.min_confidence, "tiers": tiers}
+
+
+cascade = Cascade()
@@ -0,0 +1,133 @@
+"""
+Record/replay of LLM calls, for offline benchmarks and regression tests.
+
+In ``record`` mode every response from the provider is appended to a
+JSON-lines cassette file, keyed by a hash of the request payload. In
+``replay`` mode the LLM clients answer from the cassette instead of the
+network, so the whole pipeline runs without an API key, quota or network,
+and gives the same results every time. A request that is not on the
+cassette fails with ``CassetteMiss``, like a connection error would.
+
+Recording reads streamed responses in full before handing them on, so
+record with the non-streaming endpoints if timings matter. Replaying
+them streams as usual.
+
+Settings (environment variables):
+    LLM_CASSETTE       cassette file; unset (default) disables record/replay
+    LLM_CASSETTE_MODE  replay (default) or record
+"""
+import json
+import os
+import threading
+
+import requests
+
+from .llmcache import json_digest
+
+LLM_CASSETTE = os.getenv("LLM_CASSETTE")
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "replay")
+
+# Headers worth replaying; the rest (dates, request ids) only add noise.
+_KEPT_HEADERS = ("content-type", "retry-after")
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """A replayed request was never recorded."""
+
+
+def request_key(payload):
+    """Cassette key of a chat completion ``payload``."""
+    return json_digest(payload)
+
+
+class Cassette:
+    def __init__(self, path, mode=LLM_CASSETTE_MODE):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode!r}; use record or replay")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        # Later recordings of the same request win.
+                        self._entries[entry["key"]] = entry
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    def play(self, payload):
+        """The recorded entry for ``payload``; raises ``CassetteMiss`` if none."""
+        key = request_key(payload)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for request {key[:12]} in {self.path}")
+            self.hits += 1
+            return entry
+
+    def record(self, payload, status_code, headers, body):
+        """Store a response; ``body`` is the raw response text."""
+        entry = {
+            "key": request_key(payload),
+            "model": payload.get("model"),
+            "status_code": status_code,
+            "headers": {name: value for name, value in headers.items() if name.lower() in _KEPT_HEADERS},
+            "body": body,
+        }
+        with self._lock:
+            self._entries[entry["key"]] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.recorded += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "mode": self.mode,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+            }
+
+
+def replayed_response(entry, url):
+    """A ``requests.Response`` built from a cassette entry."""
+    response = requests.Response()
+    response.status_code = entry["status_code"]
+    response.headers.update(entry["headers"])
+    response._content = entry["body"].encode("utf-8")
+    # Lets iter_lines() read the body like a streamed response
+    response._content_consumed = True
+    response.encoding = "utf-8"
+    response.url = url
+    return response
+
+
+def areplayed_response(entry, url):
+    """An ``httpx.Response`` built from a cassette entry."""
+    import httpx
+
+    return httpx.Response(
+        entry["status_code"],
+        headers=entry["headers"],
+        content=entry["body"].encode("utf-8"),
+        request=httpx.Request("POST", url),
+    )
+
+
+cassette = Cassette(LLM_CASSETTE) if LLM_CASSETTE else None
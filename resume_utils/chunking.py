@@ -0,0 +1,187 @@
+"""
+Map-reduce extraction for long resumes.
+
+A long CV (publication lists, ten-page academic resumes) is split into
+chunks along section boundaries, each chunk is extracted by its own LLM
+call, and the partial JSON objects are merged back into one result. The
+calls run in parallel, so wall-clock time follows the longest chunk
+rather than the whole document. Resumes that fit in one chunk go through
+a single call exactly as before.
+
+A document that would need more than ``LLM_MAX_CHUNKS`` chunks is first
+truncated with ``fit_sections`` (least useful sections first), so one huge
+upload can't fan out into dozens of calls against the shared rate limit.
+
+Settings (environment variables):
+    LLM_CHUNK_TOKENS   largest chunk sent in one call, 0 to disable
+                       chunking (default: 3000)
+    LLM_MAX_CHUNKS     most chunks per document (default: 4)
+    LLM_CHUNK_WORKERS  chunk calls in flight per request (default: 8)
+"""
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .sections import compact_resume, compact_sections, compaction_stats, render
+from .tokens import estimate_tokens, fit_sections, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", 3000))
+LLM_MAX_CHUNKS = int(os.getenv("LLM_MAX_CHUNKS", 4))
+LLM_CHUNK_WORKERS = int(os.getenv("LLM_CHUNK_WORKERS", 8))
+
+_executor = ThreadPoolExecutor(max_workers=LLM_CHUNK_WORKERS, thread_name_prefix="llm-chunk")
+
+
+def _section_cost(heading, body):
+    return estimate_tokens(heading or "") + sum(estimate_tokens(line) + 1 for line in body)
+
+
+def _split_section(name, heading, body, max_tokens):
+    """Split one oversized section into pieces that each repeat its heading."""
+    room = max(1, max_tokens - estimate_tokens(heading or ""))
+    pieces = []
+    lines, used = [], 0
+    for line in body:
+        cost = estimate_tokens(line) + 1
+        if cost > room:
+            line = truncate_to_tokens(line, room - 1)
+            cost = estimate_tokens(line) + 1
+        if lines and used + cost > room:
+            pieces.append((name, heading, lines))
+            lines, used = [], 0
+        lines.append(line)
+        used += cost
+    if lines:
+        pieces.append((name, heading, lines))
+    return pieces
+
+
+def split_sections(sections, max_tokens):
+    """Pack consecutive sections into chunks of at most ``max_tokens``.
+
+    Sections are never reordered. One that is too big on its own is split
+    between lines, and each piece keeps the heading so the model still
+    knows what it is reading.
+    """
+    chunks = []
+    current, used = [], 0
+    for name, heading, body in sections:
+        cost = _section_cost(heading, body)
+        pieces = [(name, heading, body)] if cost <= max_tokens else _split_section(name, heading, body, max_tokens)
+        for piece in pieces:
+            cost = _section_cost(piece[1], piece[2])
+            if current and used + cost > max_tokens:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(piece)
+            used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_resume(text, budget):
+    """Compacted resume text as a list of chunks, each fitting in ``budget`` tokens.
+
+    With chunking disabled the whole resume comes back as one chunk,
+    truncated to the budget.
+    """
+    if LLM_CHUNK_TOKENS <= 0:
+        return [compact_resume(text, max_tokens=budget)]
+
+    sections = compact_sections(text)
+    chunk_tokens = min(budget, LLM_CHUNK_TOKENS)
+    chunks = split_sections(sections, chunk_tokens)
+    if LLM_MAX_CHUNKS > 0 and len(chunks) > LLM_MAX_CHUNKS:
+        logger.warning("Resume needs %d chunks; truncating it to %d", len(chunks), LLM_MAX_CHUNKS)
+        chunks = split_sections(fit_sections(sections, LLM_MAX_CHUNKS * chunk_tokens), chunk_tokens)
+        # Packing can leave some room unused; never exceed the cap.
+        chunks = chunks[:LLM_MAX_CHUNKS]
+    chunks = [render(chunk) for chunk in chunks]
+
+    before = estimate_tokens(text)
+    after = sum(estimate_tokens(chunk) for chunk in chunks)
+    compaction_stats.record(before, after)
+    logger.info("Compacted resume from ~%d to ~%d tokens in %d chunk(s)", before, after, len(chunks))
+    return chunks or [""]
+
+
+def map_chunks(fn, chunks):
+    """``[fn(chunk) for chunk in chunks]``, with the calls run in parallel."""
+    if len(chunks) == 1:
+        return [fn(chunks[0])]
+    return list(_executor.map(fn, chunks))
+
+
+JOIN_SEPARATOR = "; "
+
+
+def _empty(value):
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _identity(item):
+    if isinstance(item, str):
+        return " ".join(item.casefold().split())
+    return json.dumps(item, sort_keys=True).casefold()
+
+
+def merge_partials(partials, records=()):
+    """Merge per-chunk extraction results into one object, in chunk order.
+
+    Lists (skills, experience, education, projects) are concatenated with
+    duplicates dropped, nested objects are merged the same way, and for any
+    other field the first non-empty value wins.
+
+    ``records`` is for flat schemas, where a group of string fields
+    (``experience_title``, ``company``, ...) stands for one entry of what
+    would otherwise be a list. Each chunk's group is taken as one record,
+    repeated records are dropped, and each field becomes the records'
+    values joined with ``JOIN_SEPARATOR``, empty ones included, so the n-th
+    title still goes with the n-th company.
+    """
+    grouped = {key for group in records for key in group}
+    merged = {}
+    for partial in partials:
+        for key, value in partial.items():
+            if key in grouped:
+                continue
+            current = merged.get(key)
+            if key not in merged or (_empty(current) and not _empty(value)):
+                merged[key] = value
+            elif isinstance(current, list) and isinstance(value, list):
+                seen = {_identity(item) for item in current}
+                for item in value:
+                    identity = _identity(item)
+                    if identity not in seen:
+                        seen.add(identity)
+                        current.append(item)
+            elif isinstance(current, dict) and isinstance(value, dict):
+                merged[key] = merge_partials([current, value])
+    for group in records:
+        merged.update(_flatten(_records(partials, group), group))
+    return merged
+
+
+def _records(partials, group):
+    records, seen = [], set()
+    for partial in partials:
+        record = {key: partial.get(key) for key in group if key in partial}
+        identity = _identity(record)
+        if not all(_empty(value) for value in record.values()) and identity not in seen:
+            seen.add(identity)
+            records.append(record)
+    return records
+
+
+def _flatten(records, group):
+    if len(records) == 1:
+        return records[0]
+    return {
+        key: JOIN_SEPARATOR.join("" if _empty(record.get(key)) else str(record[key]) for record in records)
+        for key in group
+        if any(key in record for record in records)
+    }
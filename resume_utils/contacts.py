@@ -0,0 +1,110 @@
+"""
+Deterministic extraction of contact details from resume text.
+
+Emails, phone numbers and profile URLs follow rigid enough formats that
+compiled regexes find them in microseconds. The parsers merge these results
+into the LLM output and leave the fields out of the prompt schema, which
+shortens both the prompt and the completion.
+
+Dates are found too (``find_dates``) but not merged: the schemas keep
+dates per job and degree, and a bare list of the dates in a resume can't
+say which date belongs to which. The LLM still extracts them, and the
+cascade checks its dates against these.
+"""
+import re
+
+CONTACT_FIELDS = ("email", "phone", "linkedin", "github", "portfolio")
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+
+# Loose on purpose; candidates are validated by digit count below.
+PHONE_RE = re.compile(r"(?<![\w/])\+?(?:\(?\d{1,4}\)?[ .-]?){2,5}\d{2,4}(?![\w/])")
+
+LINKEDIN_RE = re.compile(
+    r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/(?:in|pub)/[A-Za-z0-9_%-]+/?",
+    re.IGNORECASE,
+)
+GITHUB_RE = re.compile(
+    r"(?:https?://)?(?:www\.)?github\.com/[A-Za-z0-9](?:[A-Za-z0-9-]{0,38})(?![A-Za-z0-9-])",
+    re.IGNORECASE,
+)
+URL_RE = re.compile(
+    r"(?:https?://|www\.)[^\s,;()<>\"']+"
+    r"|(?<![@\w.])(?:[a-z0-9-]+\.)+(?:dev|me|io|com|net|org|site|page|app|tech|xyz)(?:/[^\s,;()<>\"']*)?(?![\w.])"
+)
+# Bare domains on these TLDs are usually personal sites; elsewhere we need a
+# scheme, subdomain or path before trusting them ("socket.io" is a skill).
+PERSONAL_TLDS = (".dev", ".me", ".site", ".page", ".xyz")
+
+MONTHS = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*\.?"
+DATE_RE = re.compile(
+    rf"\b{MONTHS}\s+(?:19|20)\d{{2}}\b"
+    r"|\b(?:0?[1-9]|1[0-2])/(?:19|20)\d{2}\b"
+    r"|\b(?:19|20)\d{2}\b"
+    r"|\b(?:Present|Current)\b",
+    re.IGNORECASE,
+)
+
+
+def _first(pattern, text):
+    match = pattern.search(text)
+    return match.group().rstrip("/.") if match else None
+
+
+def find_phone(text):
+    for match in PHONE_RE.finditer(text):
+        candidate = match.group().strip()
+        digits = sum(ch.isdigit() for ch in candidate)
+        # Ten digits rules out years and year ranges like "2019-2021".
+        if 10 <= digits <= 15:
+            return candidate
+    return None
+
+
+def find_portfolio(text):
+    for match in URL_RE.finditer(text):
+        url = match.group().rstrip("/.")
+        lowered = url.lower()
+        if "linkedin.com" in lowered or "github.com" in lowered:
+            continue
+        bare = not lowered.startswith(("http://", "https://", "www."))
+        if bare and "/" not in url and url.count(".") < 2 and not lowered.endswith(PERSONAL_TLDS):
+            continue
+        return url
+    return None
+
+
+def find_dates(text):
+    """Every date-like token (``Jan 2020``, ``03/2021``, ``2019``, ``Present``), in order."""
+    seen = []
+    for match in DATE_RE.finditer(text):
+        value = match.group()
+        if value not in seen:
+            seen.append(value)
+    return seen
+
+
+def extract_contacts(text):
+    """Contact fields found in ``text``; fields that weren't found are ``None``."""
+    return {
+        "email": _first(EMAIL_RE, text),
+        "phone": find_phone(text),
+        "linkedin": _first(LINKEDIN_RE, text),
+        "github": _first(GITHUB_RE, text),
+        "portfolio": find_portfolio(text),
+    }
+
+
+def merge_contacts(parsed_data, contacts, fields=CONTACT_FIELDS):
+    """Fill contact fields into an LLM result, preferring the regex matches.
+
+    Contact fields not named in ``fields`` are removed.
+    """
+    for field in CONTACT_FIELDS:
+        if field not in fields:
+            parsed_data.pop(field, None)
+        elif contacts.get(field):
+            parsed_data[field] = contacts[field]
+        else:
+            parsed_data.setdefault(field, None)
+    return parsed_data
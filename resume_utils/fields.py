@@ -0,0 +1,30 @@
+"""
+Field selection for the parse endpoints.
+
+Callers that only need a few fields (``fields=skills``, or
+``fields=email,phone``) get a prompt that asks for just those, so the LLM
+reads and writes less. Contact fields come from regexes, so a selection
+made only of contact fields skips the LLM entirely.
+"""
+
+
+def parse_fields(values, available):
+    """Parse ``fields=a,b`` / ``fields=a&fields=b`` into known field names.
+
+    Returns the selected names in ``available`` order, so the same
+    selection always builds the same prompt and cache key, or all of
+    ``available`` when nothing was selected. Raises ``ValueError`` naming
+    any unknown field.
+    """
+    names = {name.strip() for value in values for name in value.split(",")} - {""}
+    unknown = sorted(names.difference(available))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}")
+    if not names:
+        return tuple(available)
+    return tuple(name for name in available if name in names)
+
+
+def build_prompt(head, field_prompts, fields, tail):
+    """Prompt text listing only the ``field_prompts`` entries in ``fields``."""
+    return head + "".join(field_prompts[name] for name in fields if name in field_prompts) + tail
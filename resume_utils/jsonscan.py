@@ -0,0 +1,114 @@
+"""
+Tolerant extraction of the JSON object in an LLM reply.
+
+Models wrap JSON in code fences, follow it with commentary, leave trailing
+commas, and get cut off mid-string when they hit ``max_tokens``.
+``extract_json`` walks the reply once, token by token, and returns the
+first object repaired into valid JSON:
+
+- text before the first ``{`` (fences, "Here is the JSON:") is skipped,
+  and so is everything after the matching ``}``;
+- trailing commas before ``}`` / ``]`` are dropped;
+- a truncated reply has its open string closed, any dangling key or
+  comma removed, and its open objects and arrays closed.
+
+Strings are matched by one unrolled regex, so the scan is linear in the
+length of the reply and never backtracks. Run ``python -m resume_utils.jsonscan``
+for a micro-benchmark.
+"""
+import json
+import re
+
+# A string (closing quote optional, for truncated replies), a structural
+# character, or a run of anything else (numbers, literals, whitespace).
+_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*("?)|[{}\[\],:]|[^"{}\[\],:]+', re.DOTALL)
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def extract_json(text):
+    """Return the first JSON object in ``text`` as repaired JSON text.
+
+    Returns ``None`` if ``text`` has no ``{`` at all. The result is not
+    guaranteed to parse (a reply can be garbage inside the braces), but the
+    common glitches listed in the module docstring are fixed.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    out = []
+    stack = []
+    for match in _TOKEN_RE.finditer(text, start):
+        token = match.group()
+        first = token[0]
+        if first == '"':
+            if match.group(1):
+                out.append(token)
+            else:
+                # Unterminated string: the reply was cut off here.
+                out.append(token.rstrip("\\") + '"')
+                break
+        elif first in _CLOSERS:
+            stack.append(_CLOSERS[first])
+            out.append(first)
+        elif first in "}]":
+            if out[-1] == ",":
+                out.pop()
+            # Trust the structure we've seen over a mismatched bracket.
+            out.append(stack.pop())
+            if not stack:
+                return "".join(out)
+        elif first in ",:":
+            out.append(first)
+        else:
+            token = token.strip()
+            if token:
+                out.append(token)
+
+    # Truncated: finish the value in progress, then close what is open.
+    if out[-1] == ":":
+        out.append("null")
+    elif out[-1] == ",":
+        out.pop()
+    elif stack[-1] == "}" and out[-1].startswith('"') and out[-2] in ("{", ","):
+        # A key with no value yet.
+        out.pop()
+        if out[-1] == ",":
+            out.pop()
+    out.extend(reversed(stack))
+    return "".join(out)
+
+
+def parse_json(text):
+    """``json.loads`` of ``extract_json(text)``.
+
+    Raises ``json.JSONDecodeError`` if there is no object or it still
+    doesn't parse. Raw control characters inside strings are accepted.
+    """
+    json_string = extract_json(text)
+    if json_string is None:
+        raise json.JSONDecodeError("No JSON object found", text, 0)
+    return json.loads(json_string, strict=False)
+
+
+def _benchmark():
+    import timeit
+
+    entry = {
+        "title": "Senior Engineer",
+        "company": "Acme, Inc. {EMEA}",
+        "description": 'Built "fast" things \\ shipped [many] of them, on time.',
+        "technologies": ["Python", "Go", "Kubernetes"],
+    }
+    for entries in (10, 1000, 10000):
+        body = json.dumps({"name": "Jane Doe", "experience": [entry] * entries}, indent=2)
+        reply = "```json\n" + body.replace("]\n}", "],\n}") + "\n```\nLet me know if you need anything else!"
+        truncated = reply[: len(reply) // 2]
+        for label, sample in (("fenced", reply), ("truncated", truncated)):
+            runs = max(1, 2000 // entries)
+            seconds = timeit.timeit(lambda: parse_json(sample), number=runs) / runs
+            print(f"{label:>9} {len(sample):>10,} chars: {seconds * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,129 @@
+"""
+Incremental parsing of a streamed JSON reply, one top-level field at a time.
+
+``FieldStream`` is fed the completion text as it arrives and hands back
+each top-level ``key: value`` pair as soon as its value is complete, so a
+client can render ``name`` while ``experience`` is still being generated.
+Each character is looked at once, however the reply is split into chunks:
+chunks are kept in a list and only the text of the field being read is
+joined, when the field completes.
+"""
+import json
+
+from .jsonscan import parse_json
+
+
+class FieldStream:
+    def __init__(self):
+        self._chunks = []
+        # Chunks from the one holding the oldest open key or value onwards,
+        # and the offset of the first of them in the whole reply.
+        self._window = []
+        self._window_start = 0
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+        self._closed = False
+        self.emitted = set()
+
+    def feed(self, chunk):
+        """Add text; return ``(key, value)`` pairs completed by it, in order."""
+        if self._closed or not chunk:
+            self._chunks.append(chunk)
+            return []
+        self._chunks.append(chunk)
+        if not self._window:
+            self._window_start = self._pos
+        self._window.append(chunk)
+        fields = []
+        pos = self._pos
+        for ch in chunk:
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(self._slice(self._key_start, pos + 1), strict=False)
+                        self._key_start = None
+            elif self._depth == 0:
+                # Anything before the object (fences, preamble) is skipped.
+                if ch == "{":
+                    self._depth = 1
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = pos
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_value(pos, fields)
+                    self._closed = True
+                    pos += 1
+                    break
+            elif self._depth == 1:
+                if ch == ":" and self._key is not None and self._value_start is None:
+                    self._value_start = pos + 1
+                elif ch == ",":
+                    self._finish_value(pos, fields)
+            pos += 1
+        self._pos = pos
+        self._trim()
+        return fields
+
+    def _slice(self, start, end):
+        """The reply's text from ``start`` to ``end``, both within the window."""
+        text = "".join(self._window)[start - self._window_start:]
+        # Nothing before the key or value being read is needed again.
+        self._window, self._window_start = [text], start
+        return text[:end - start]
+
+    def _trim(self):
+        """Drop the chunks before the oldest key or value still being read."""
+        starts = [start for start in (self._key_start, self._value_start) if start is not None]
+        if not starts or self._closed:
+            self._window = []
+            return
+        keep = min(starts)
+        while len(self._window) > 1 and self._window_start + len(self._window[0]) <= keep:
+            self._window_start += len(self._window.pop(0))
+
+    def _finish_value(self, end, fields):
+        key, start = self._key, self._value_start
+        self._key = self._value_start = None
+        if key is None or start is None or key in self.emitted:
+            return
+        raw = self._slice(start, end).strip()
+        if not raw:
+            return
+        try:
+            # Reuse the tolerant scanner for trailing commas inside the value.
+            value = parse_json('{"value": ' + raw + "}")["value"]
+        except (json.JSONDecodeError, KeyError):
+            return
+        self.emitted.add(key)
+        fields.append((key, value))
+
+    def finish(self):
+        """Parse the whole reply once the stream ends.
+
+        Returns ``(result, remaining)``: the complete object, repaired if the
+        reply was cut off, and the ``(key, value)`` pairs not yet returned by
+        ``feed``. Raises ``json.JSONDecodeError`` if no object can be parsed.
+        """
+        result = parse_json(self.text)
+        remaining = [(key, value) for key, value in result.items() if key not in self.emitted]
+        self.emitted.update(key for key, _ in remaining)
+        return result, remaining
+
+    @property
+    def text(self):
+        return "".join(self._chunks)
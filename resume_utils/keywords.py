@@ -0,0 +1,303 @@
+"""
+Local lexical matching of a parsed resume against a job description.
+
+Most of a match analysis is set arithmetic: which of the job description's
+important terms does the resume mention? ``keyword_match`` answers that in
+about a millisecond, with no LLM call:
+
+- the job description is tokenized and its terms weighted by saturated
+  term frequency (the BM25 TF curve), with known skills weighted double;
+  the weights depend on the job description alone, so the same resume
+  and posting always score the same, in every worker;
+- the resume's strings are tokenized per section (skills, experience,
+  education, all of it);
+- known skills in either are found with ``resume_utils.skills`` and become one
+  term per skill, whatever the spelling, so "k8s" in a resume covers
+  "Kubernetes" in a posting;
+- each score is the weighted share of the top terms a section covers,
+  computed as one presence-matrix by weight-vector product. Generic
+  posting words ("design", "platform") are left out of every score, the
+  skills score counts only the posting's known skills, found anywhere in
+  the resume, and the education score only its degree terms.
+
+There is no IDF: it needs a corpus of postings, and a shared one makes a
+score depend on whatever else was matched before. Generic words are
+excluded by ``_GENERIC_TERMS`` instead.
+
+``missingKeywords`` are the heaviest skills and other meaningful terms the
+resume never mentions, in the job description's own spelling. The scores are lexical: synonyms and
+related experience are not credited, which is what the LLM is still for.
+
+The matchers run in one of ``MATCH_MODES``: ``llm`` has the LLM do the
+whole analysis; ``hybrid`` takes the scores and missing keywords from
+``keyword_match`` and asks the LLM only for recommended improvements;
+``fast`` skips the LLM.
+
+Settings (environment variables):
+    KEYWORD_TOP_TERMS  job description terms scored per match (default: 30)
+    MATCH_MODE         default match mode: llm, hybrid (default) or fast
+"""
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from .skills import get_skill_index
+
+KEYWORD_TOP_TERMS = int(os.getenv("KEYWORD_TOP_TERMS", 30))
+MATCH_MODES = ("llm", "hybrid", "fast")
+MATCH_MODE = os.getenv("MATCH_MODE", "hybrid")
+MISSING_KEYWORDS = 10
+
+# BM25 term frequency saturation: the fifth mention of a term adds little.
+BM25_K1 = 1.2
+# Known skills are what a posting asks for; they outweigh plain words.
+SKILL_WEIGHT = 2.0
+
+# Terms like "c++", "c#" and "node.js" stay whole.
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*", re.IGNORECASE)
+_LETTER_RE = re.compile(r"[a-z]")
+_SKILL_PREFIX = "skill:"
+
+_STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers him his how
+i if in into is it its itself just me more most my no nor not now of off on once only or other our ours out over own
+same she should so some such than that the their theirs them then there these they this those through to too under
+until up very was we were what when where which while who whom why will with would you your yours
+able ability across etc e.g i.e via within without well including include includes like new plus per using use used
+job role position candidate candidates company team teams work working works looking seeking join us you'll we're
+experience experienced years year strong excellent good great solid proven demonstrated knowledge understanding
+skills skill responsibilities responsible requirements required require preferred nice bonus must ideal ideally
+environment opportunity opportunities apply applicants benefits salary full part time day days based
+help helping build building develop developing ensure support supporting across other others related relevant
+senior junior mid level
+need needs needed want wants wanted looking look seek seeks hire hiring player players ideal
+self starter motivated passionate passion dynamic fast paced exciting fun love thrive
+familiarity familiar proficiency proficient expertise exposure hands minimum least
+closely collaborate collaborative cross functional
+""".split())
+
+# Words nearly every posting uses. Tokens like any other, but no score
+# counts them and they are never reported missing.
+_GENERIC_TERMS = frozenset("""
+design designing designs operate operating operation operations write writing written platform platforms
+system systems product products service services solution solutions tool tools technology technologies
+technical process processes project projects problem problems application applications software code
+business customer customers user users feature features best practices high scale scalable reliable
+complex large world class modern key core various multiple deliver delivering drive driving own owning
+manage managing lead leading maintain maintaining implement implementing create creating improve improving
+""".split())
+
+# Spellings of degrees, folded into one term each.
+_DEGREES = {
+    "bachelor": "bachelor's bachelors bsc b.sc b.s b.a b.tech btech b.e undergraduate",
+    "master": "master's masters msc m.sc m.s m.a m.tech mtech mba",
+    "phd": "ph.d doctorate doctoral",
+}
+_CANONICAL = {alias: term for term, aliases in _DEGREES.items() for alias in aliases.split()}
+# Undotted spellings that are also ordinary words ("50 ms"): a degree only
+# next to one of _DEGREE_CONTEXT ("MS in Physics", "BA degree"), or alone.
+_BARE_DEGREES = {"bs": "bachelor", "ba": "bachelor", "ms": "master", "ma": "master"}
+_DEGREE_CONTEXT = frozenset("in degree degrees".split())
+
+# Job description terms that ask for a degree rather than a skill. The
+# generic ones are met by any education at all.
+_DEGREE_TERMS = frozenset(_DEGREES)
+_DEGREE_RANKS = {"bachelor": 0, "master": 1, "phd": 2}
+_GENERIC_EDUCATION_TERMS = frozenset("degree degrees diploma graduate university college".split())
+
+# Resume keys, at any depth, whose strings count towards each section.
+_SECTION_KEYS = {
+    "skills": ("skill", "technolog"),
+    "experience": ("experience", "title", "company", "project", "summary"),
+    "education": ("education", "degree", "university", "graduation"),
+}
+SECTIONS = ("all",) + tuple(_SECTION_KEYS)
+
+
+def parse_mode(value):
+    """The match mode named by a request parameter; the default if empty.
+
+    Raises ``ValueError`` for an unknown mode.
+    """
+    if not value:
+        return MATCH_MODE
+    if value not in MATCH_MODES:
+        raise ValueError(f"Unknown mode {value!r}; use one of: {', '.join(MATCH_MODES)}")
+    return value
+
+
+def tokenize(text):
+    """Terms of ``text``: a ``skill:<id>`` term per known skill, and the other
+    words lower-cased, without stopwords, numbers or single letters.
+    """
+    terms = []
+    pos = 0
+    for match in get_skill_index().find(text):
+        terms.extend(_words(text[pos:match.start]))
+        terms.append(_SKILL_PREFIX + match.skill_id)
+        pos = match.end
+    terms.extend(_words(text[pos:]))
+    return terms
+
+
+def _words(text):
+    return [
+        word for word, _ in _word_spellings(text)
+        if len(word) > 1 and word not in _STOPWORDS and _LETTER_RE.search(word)
+    ]
+
+
+def _word_spellings(text):
+    """``(term, spelling)`` for every word of ``text``, stopwords included."""
+    spellings = [match.group().rstrip(".") for match in _TOKEN_RE.finditer(text)]
+    tokens = [spelling.casefold() for spelling in spellings]
+    for i, token in enumerate(tokens):
+        term = _CANONICAL.get(token, token)
+        if token in _BARE_DEGREES:
+            neighbours = tokens[max(i - 1, 0):i] + tokens[i + 1:i + 2]
+            if not neighbours or _DEGREE_CONTEXT.intersection(neighbours):
+                term = _BARE_DEGREES[token]
+        yield term, spellings[i]
+
+
+class KeywordStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.matches = 0
+        self.seconds = 0.0
+
+    def record(self, seconds):
+        with self._lock:
+            self.matches += 1
+            self.seconds += seconds
+
+    def stats(self):
+        with self._lock:
+            average = self.seconds / self.matches * 1000 if self.matches else 0.0
+            return {"matches": self.matches, "avg_ms": round(average, 3)}
+
+
+keyword_stats = KeywordStats()
+
+
+def _section_strings(value, path=()):
+    """Yield ``(sections, string)`` for every string in a parsed resume."""
+    if isinstance(value, str):
+        sections = {"all"}
+        for section, keys in _SECTION_KEYS.items():
+            if any(key in part for part in path for key in keys):
+                sections.add(section)
+        yield sections, value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _section_strings(item, path)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from _section_strings(item, path + (str(key).casefold(),))
+
+
+def resume_terms(resume_data):
+    """Term sets of the parsed resume, per section in ``SECTIONS``."""
+    terms = {section: set() for section in SECTIONS}
+    for sections, text in _section_strings(resume_data):
+        tokens = tokenize(text)
+        for section in sections:
+            terms[section].update(tokens)
+    return terms
+
+
+def job_terms(job_description, top=KEYWORD_TOP_TERMS):
+    """The ``top`` job description terms and their weights, heaviest first.
+
+    A pure function of ``job_description``. Also returns each term's first
+    spelling in the job description.
+    """
+    spellings = {}
+    for term, spelling in _word_spellings(job_description):
+        spellings.setdefault(term, spelling)
+    index = get_skill_index()
+    for skill_id in index.skills(job_description):
+        spellings[_SKILL_PREFIX + skill_id] = index.name(skill_id)
+    tokens = tokenize(job_description)
+    if not tokens:
+        return [], np.zeros(0), spellings
+
+    counts = Counter(tokens)
+    terms = list(counts)
+    tf = np.array([counts[term] for term in terms], dtype=float)
+    kind = np.array([SKILL_WEIGHT if term.startswith(_SKILL_PREFIX) else 1.0 for term in terms])
+    weights = kind * tf * (BM25_K1 + 1) / (tf + BM25_K1)
+    order = np.argsort(-weights, kind="stable")[:top]
+    return [terms[i] for i in order], weights[order], spellings
+
+
+def keyword_match(resume_data, job_description):
+    """Lexical match scores, in the shape of the LLM's match analysis.
+
+    ``recommendedImprovements`` suggests mentioning the top missing known
+    skills; the LLM writes better ones when it is asked.
+    """
+    started = time.monotonic()
+    terms, weights, spellings = job_terms(job_description)
+    kept = [i for i, term in enumerate(terms) if term not in _GENERIC_TERMS]
+    terms, weights = [terms[i] for i in kept], weights[kept]
+    resume = resume_terms(resume_data)
+
+    if not terms:
+        keyword_stats.record(time.monotonic() - started)
+        return {
+            "overallMatch": 0, "skillsMatch": 0, "experienceMatch": 0, "educationMatch": 0,
+            "missingKeywords": [], "recommendedImprovements": [],
+        }
+
+    # Rows: sections; columns: job description terms.
+    present = np.array([[term in resume[section] for term in terms] for section in SECTIONS], dtype=float)
+    # A degree asked for is met by the same or a higher one, and "degree" by any.
+    held = [_DEGREE_RANKS[term] for term in resume["education"] & _DEGREE_TERMS]
+    education = np.array([term in _DEGREE_TERMS or term in _GENERIC_EDUCATION_TERMS for term in terms])
+    for index in np.flatnonzero(education):
+        term = terms[index]
+        if term in _DEGREE_TERMS:
+            met = any(rank >= _DEGREE_RANKS[term] for rank in held)
+        else:
+            met = bool(resume["education"])
+        if met:
+            present[[0, SECTIONS.index("education")], index] = 1.0
+    coverage = dict(zip(SECTIONS, present @ weights / weights.sum()))
+
+    def covered(section, mask):
+        return present[SECTIONS.index(section)][mask] @ weights[mask] / weights[mask].sum()
+
+    # Skills are the posting's known skills, wherever the resume shows them.
+    skill = np.array([term.startswith(_SKILL_PREFIX) for term in terms])
+    if skill.any():
+        coverage["skills"] = covered("all", skill)
+    # Experience is scored on the terms that aren't about education.
+    if (~education).any():
+        coverage["experience"] = covered("experience", ~education)
+    # Education is scored on the education terms alone, if the posting asks for any.
+    coverage["education"] = covered("education", education) if education.any() else 1.0
+
+    # Known skills first, then the other terms, heaviest first in each.
+    missing = [term for term, found in zip(terms, present[0]) if not found]
+    skills = [term for term in missing if term.startswith(_SKILL_PREFIX)]
+    # Two-letter words left over are mostly units and abbreviations ("ms").
+    words = [term for term in missing if not term.startswith(_SKILL_PREFIX) and len(term) > 2]
+    missing = (skills + words)[:MISSING_KEYWORDS]
+    result = {
+        "overallMatch": round(100 * coverage["all"]),
+        "skillsMatch": round(100 * coverage["skills"]),
+        "experienceMatch": round(100 * coverage["experience"]),
+        "educationMatch": round(100 * coverage["education"]),
+        "missingKeywords": [spellings.get(term, term) for term in missing],
+        "recommendedImprovements": [
+            f"Mention {spellings.get(term, term)} if you have experience with it." for term in skills[:5]
+        ],
+    }
+    keyword_stats.record(time.monotonic() - started)
+    return result
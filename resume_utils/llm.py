@@ -0,0 +1,454 @@
+"""
+Shared HTTP client for the Groq (OpenAI-compatible) chat completions API.
+
+Every LLM call site goes through one ``requests.Session`` so connections are
+kept alive and reused instead of paying for a new TCP+TLS handshake per
+request. ``AsyncLLMClient`` is the asyncio equivalent for ASGI views; it
+needs ``httpx`` and caps the calls in flight with a semaphore. Both clients
+go through the shared ``resume_utils.ratelimit`` scheduler, which paces requests
+and retries 429/5xx responses with backoff.
+
+With ``LLM_CASSETTE`` set, both clients record responses to, or replay
+them from, a ``resume_utils.cassette`` file instead of calling the provider.
+
+``LLMClient.stream`` asks for a streamed completion (sync client only);
+``iter_deltas`` then yields the generated text as it arrives.
+
+Hedging (opt-in, sync client only): when a hedge-eligible call has not
+answered within the recent p95 latency of its model and call site, a
+duplicate request is sent and whichever returns a good response first
+wins. The delay runs from when the first request is actually sent, not
+while it waits for rate limit capacity. Hedges are capped at a fraction of
+eligible calls so a slow provider can't double our traffic, and at
+``LLM_POOL_SIZE`` in flight; the first requests themselves are not capped.
+
+Settings (environment variables):
+    GROQ_API_KEY          bearer token sent with every request
+    LLM_BASE_URL          API root (default: https://api.groq.com/openai/v1);
+                          point it at a local stand-in server for load tests
+                          (``python -m resume_utils.stubserver``)
+    LLM_CONNECT_TIMEOUT   seconds to wait for a connection (default: 5)
+    LLM_READ_TIMEOUT      seconds to wait for a response (default: 60)
+    LLM_POOL_SIZE         keep-alive connections per host (default: 20)
+    LLM_MAX_CONCURRENCY   async calls in flight per event loop (default: 200)
+    LLM_HEDGE             set to 1 to enable hedged requests
+    LLM_HEDGE_PERCENTILE  latency percentile after which to hedge (default: 95)
+    LLM_HEDGE_DELAY       hedge delay used until enough latencies are seen (default: 10)
+    LLM_HEDGE_BUDGET      max hedges as a fraction of eligible calls (default: 0.1)
+    LLM_JSON_MODE         set to 0 for servers without ``response_format``
+                          JSON mode (default: 1)
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cassette import areplayed_response, cassette, replayed_response
+from .ratelimit import (
+    LLM_MAX_RETRIES,
+    RETRY_STATUSES,
+    QueueFull,
+    backoff_delay,
+    estimate_payload_tokens,
+    limiter,
+)
+from .tokens import estimate_messages_tokens, token_usage
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", 60))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", 20))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 200))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", 10))
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", 0.1))
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "1") == "1"
+
+
+class RateLimitExceeded(requests.exceptions.RequestException):
+    """No rate limit capacity became available in time; nothing was sent."""
+
+
+def _record_usage(payload, prompt_tokens, tokens, response):
+    try:
+        usage = response.json()["usage"]
+    except (ValueError, KeyError, TypeError):
+        usage = {}
+    limiter.settle(tokens, usage.get("total_tokens"))
+    token_usage.record(payload.get("model"), prompt_tokens, usage.get("prompt_tokens"))
+
+
+def json_mode(payload):
+    """``payload`` asking the provider for a JSON object reply, if enabled."""
+    if not LLM_JSON_MODE:
+        return payload
+    return dict(payload, response_format={"type": "json_object"})
+
+
+def completion_content(response):
+    """Text of a chat completion response, or ``None`` if the call failed.
+
+    In JSON mode, Groq rejects a reply that isn't valid JSON with a 400
+    ``json_validate_failed`` error carrying the reply as
+    ``failed_generation``. That text is returned too, so the tolerant JSON
+    scanner can repair it instead of the caller paying for another call.
+    """
+    if response.status_code == 200:
+        return response.json()["choices"][0]["message"]["content"]
+    if response.status_code == 400:
+        try:
+            error = response.json()["error"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        if isinstance(error, dict) and error.get("code") == "json_validate_failed":
+            return error.get("failed_generation")
+    return None
+
+
+def iter_deltas(response):
+    """Yield the content of a streamed chat completion as it arrives."""
+    for line in response.iter_lines():
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            break
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+        for choice in chunk.get("choices") or ():
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+class HedgePolicy:
+    """Tracks recent latencies and decides when a duplicate request may fire.
+
+    Latencies are kept per ``key`` (model and call site): a small model's
+    parse and a large model's match have little in common.
+    """
+
+    MIN_SAMPLES = 20
+
+    def __init__(self, percentile=LLM_HEDGE_PERCENTILE, default_delay=LLM_HEDGE_DELAY,
+                 budget=LLM_HEDGE_BUDGET, window=500):
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.budget = budget
+        self.window = window
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.fired = 0
+        self.won = 0
+
+    def record(self, key, latency):
+        with self._lock:
+            latencies = self._latencies.get(key)
+            if latencies is None:
+                latencies = self._latencies[key] = deque(maxlen=self.window)
+            latencies.append(latency)
+
+    def delay(self, key):
+        with self._lock:
+            latencies = self._latencies.get(key, ())
+            if len(latencies) < self.MIN_SAMPLES:
+                return self.default_delay
+            ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+
+    def start_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def record_win(self):
+        with self._lock:
+            self.won += 1
+
+    def try_fire(self):
+        """Count a hedge if the budget allows one."""
+        with self._lock:
+            if self.fired + 1 > self.budget * self.calls:
+                return False
+            self.fired += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            keys = list(self._latencies)
+            calls, fired, won = self.calls, self.fired, self.won
+        return {
+            "enabled": LLM_HEDGE,
+            "calls": calls,
+            "hedges_fired": fired,
+            "hedges_won": won,
+            "delays": {"/".join(map(str, key)): self.delay(key) for key in keys},
+        }
+
+
+def _spawn(fn, *args, **kwargs):
+    """Run ``fn`` on a new daemon thread; returns its ``Future``."""
+    future = Future()
+
+    def run():
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True, name="llm-primary").start()
+    return future
+
+
+class LLMClient:
+    """Thin pooled client for ``POST {base_url}/chat/completions``."""
+
+    def __init__(self, base_url=LLM_BASE_URL, api_key=GROQ_API_KEY,
+                 connect_timeout=LLM_CONNECT_TIMEOUT, read_timeout=LLM_READ_TIMEOUT,
+                 pool_size=LLM_POOL_SIZE, max_retries=LLM_MAX_RETRIES, hedging=LLM_HEDGE):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.hedging = hedging
+        self.hedge_policy = HedgePolicy()
+        self._hedge_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="llm-hedge")
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+
+    @property
+    def chat_url(self):
+        return f"{self.base_url}/chat/completions"
+
+    def chat(self, payload, hedge=None):
+        """Send a chat completion request and return the raw response.
+
+        Waits for rate limit capacity first, and retries 429/5xx responses
+        and failed connections with backoff. The last response is returned
+        once retries run out. Raises ``requests.exceptions.RequestException``
+        on connection errors and timeouts, like ``requests.post`` does, and
+        ``RateLimitExceeded`` when the request could not be scheduled.
+
+        ``hedge`` names the call site (``"parse"``, ``"match"``) of a call
+        that is safe to duplicate; it is only hedged when hedging is enabled
+        on the client.
+        """
+        if not hedge:
+            return self._send(payload)
+        key = (payload.get("model"), hedge)
+        if self.hedging:
+            return self._hedged_chat(payload, key)
+
+        sent_at = []
+        response = self._send(payload, on_sent=lambda: sent_at.append(time.monotonic()))
+        if response.status_code == 200 and sent_at:
+            self.hedge_policy.record(key, time.monotonic() - sent_at[0])
+        return response
+
+    def _hedged_chat(self, payload, key):
+        policy = self.hedge_policy
+        policy.start_call()
+
+        # The first request runs on a thread of its own, so hedging never
+        # caps how many calls are in flight; only hedges use the pool.
+        sent = threading.Event()
+        primary = _spawn(self._send, payload, on_sent=sent.set)
+        primary.add_done_callback(lambda _: sent.set())
+        sent.wait()
+        started = time.monotonic()
+        pending = {primary}
+        done, _ = wait(pending, timeout=policy.delay(key))
+        if not done and policy.try_fire():
+            pending.add(self._hedge_executor.submit(self._send, payload))
+
+        # Return the first good response; otherwise the primary's outcome.
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and future.result().status_code == 200:
+                    policy.record(key, time.monotonic() - started)
+                    if future is not primary:
+                        policy.record_win()
+                    return future.result()
+        return primary.result()
+
+    def stream(self, payload):
+        """Send a streamed chat completion request and return the raw response.
+
+        Scheduled and retried like ``chat``, but never hedged. The body is
+        left unread; pass a 200 response to ``iter_deltas`` to read the
+        completion as it is generated.
+        """
+        payload = dict(payload, stream=True)
+        # Providers don't support JSON mode on streamed completions.
+        payload.pop("response_format", None)
+        return self._send(payload, stream=True)
+
+    def _send(self, payload, stream=False, on_sent=None):
+        if cassette is not None and cassette.replaying:
+            return replayed_response(cassette.play(payload), self.chat_url)
+        response = self._post(payload, stream, on_sent)
+        if cassette is not None and cassette.recording:
+            # Reads a streamed body in full, so it can be stored
+            cassette.record(payload, response.status_code, response.headers, response.text)
+        return response
+
+    def _post(self, payload, stream, on_sent=None):
+        prompt_tokens = estimate_messages_tokens(payload["messages"])
+        tokens = estimate_payload_tokens(payload, prompt_tokens)
+        for attempt in range(self.max_retries + 1):
+            try:
+                limiter.acquire(tokens)
+            except QueueFull as e:
+                raise RateLimitExceeded(str(e)) from e
+            if on_sent is not None:
+                on_sent()
+
+            try:
+                response = self.session.post(self.chat_url, json=payload, timeout=self.timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout):
+                # Read timeouts are not retried: the model may still be busy
+                # with the first attempt.
+                if attempt == self.max_retries:
+                    limiter.release(tokens)
+                    raise
+                limiter.retry(tokens)
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            retry_after = limiter.update(response.status_code, response.headers)
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                response.close()
+                limiter.retry(tokens)
+                time.sleep(backoff_delay(attempt, retry_after))
+                continue
+
+            if response.status_code == 200:
+                if stream:
+                    # Usage is only known once the stream has been read.
+                    token_usage.record(payload.get("model"), prompt_tokens)
+                else:
+                    _record_usage(payload, prompt_tokens, tokens, response)
+            else:
+                limiter.release(tokens)
+            return response
+
+
+class AsyncLLMClient:
+    """asyncio client for ``POST {base_url}/chat/completions``.
+
+    Instances are bound to the event loop they were created on; use
+    ``get_async_client()`` rather than sharing one across loops.
+    """
+
+    def __init__(self, base_url=LLM_BASE_URL, api_key=GROQ_API_KEY,
+                 connect_timeout=LLM_CONNECT_TIMEOUT, read_timeout=LLM_READ_TIMEOUT,
+                 pool_size=LLM_POOL_SIZE, max_concurrency=LLM_MAX_CONCURRENCY,
+                 max_retries=LLM_MAX_RETRIES):
+        import httpx
+
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.client = httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=pool_size),
+        )
+
+    @property
+    def chat_url(self):
+        return f"{self.base_url}/chat/completions"
+
+    async def chat(self, payload):
+        """Send a chat completion request and return the raw response.
+
+        Waits for a free slot when ``max_concurrency`` calls are already in
+        flight, and retries like ``LLMClient.chat``. Raises
+        ``httpx.HTTPError`` on connection errors and timeouts, and
+        ``RateLimitExceeded`` when the request could not be scheduled.
+        """
+        if cassette is not None and cassette.replaying:
+            return areplayed_response(cassette.play(payload), self.chat_url)
+        response = await self._post(payload)
+        if cassette is not None and cassette.recording:
+            cassette.record(payload, response.status_code, response.headers, response.text)
+        return response
+
+    async def _post(self, payload):
+        import httpx
+
+        prompt_tokens = estimate_messages_tokens(payload["messages"])
+        tokens = estimate_payload_tokens(payload, prompt_tokens)
+        for attempt in range(self.max_retries + 1):
+            try:
+                await limiter.aacquire(tokens)
+            except QueueFull as e:
+                raise RateLimitExceeded(str(e)) from e
+
+            try:
+                async with self._semaphore:
+                    response = await self.client.post(self.chat_url, json=payload)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt == self.max_retries:
+                    limiter.release(tokens)
+                    raise
+                limiter.retry(tokens)
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            retry_after = limiter.update(response.status_code, response.headers)
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                limiter.retry(tokens)
+                await asyncio.sleep(backoff_delay(attempt, retry_after))
+                continue
+
+            if response.status_code == 200:
+                _record_usage(payload, prompt_tokens, tokens, response)
+            else:
+                limiter.release(tokens)
+            return response
+
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """Return the process-wide LLM client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
+
+
+def get_async_client():
+    """Return the async LLM client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncLLMClient()
+    return client
@@ -0,0 +1,68 @@
+"""
+Caches for LLM results, so identical requests skip the Groq round-trip.
+
+Keys combine a hash of the normalized input with the model name and the
+prompt version, so changing either one naturally invalidates old entries.
+Only successfully parsed results are stored; error dicts never are.
+
+Settings (environment variables):
+    LLM_CACHE_BACKEND      memory (default), sqlite or django
+    LLM_CACHE_TTL          seconds a result stays valid (default: one day)
+    LLM_CACHE_MAX_ENTRIES  entries kept per cache before LRU eviction
+    LLM_CACHE_PATH         SQLite file used by the sqlite backend
+"""
+import hashlib
+import json
+import os
+
+from .cache import make_cache
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 24 * 60 * 60))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1024))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+
+
+def text_digest(text):
+    """SHA-256 of ``text`` with all runs of whitespace collapsed."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def json_digest(data):
+    """SHA-256 of the canonical (sorted keys, compact) JSON form of ``data``."""
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """JSON result cache over one of the ``resume_utils.cache`` backends."""
+
+    def __init__(self, name):
+        self.name = name
+        self.backend = make_cache(
+            LLM_CACHE_BACKEND,
+            LLM_CACHE_MAX_ENTRIES,
+            ttl=LLM_CACHE_TTL,
+            path=LLM_CACHE_PATH,
+            name=name,
+        )
+
+    @staticmethod
+    def key(*parts):
+        return ":".join(str(part) for part in parts)
+
+    def get(self, key):
+        raw = self.backend.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, result):
+        if not isinstance(result, dict) or "error" in result:
+            return
+        self.backend.set(key, json.dumps(result))
+
+    def stats(self):
+        return self.backend.stats()
+
+
+parse_cache = ResultCache("llm_parse")
+match_cache = ResultCache("llm_match")
@@ -0,0 +1,210 @@
+"""
+In-memory PDF text extraction shared by the Flask and Django backends.
+
+Uploads are read straight from the request stream instead of being saved to
+a fixed path first, so concurrent requests never touch the same file and the
+common case does no disk I/O at all. Longer documents are split into page
+ranges and extracted on a process pool that stays warm between requests.
+Extracted text is cached under the SHA-256 of the uploaded bytes, so
+re-uploading the same file skips PDF parsing entirely. Pages are separated
+by form feeds (``\\f``) so later stages can tell running headers apart.
+
+Settings (environment variables):
+    PDF_EXTRACT_WORKERS     size of the extraction pool (default: CPU count)
+    PDF_PARALLEL_MIN_PAGES  documents shorter than this are extracted inline
+    PDF_MAX_PAGES           pages beyond this cap are ignored, with a warning
+    PDF_TEXT_CACHE_BYTES    in-memory text cache budget, in bytes of UTF-8
+    PDF_TEXT_CACHE_DIR      enables an on-disk cache tier in this directory
+"""
+import hashlib
+import io
+import logging
+import mmap
+import os
+import threading
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from itertools import chain
+from tempfile import SpooledTemporaryFile
+
+from pypdf import PdfReader
+
+from .cache import DirectoryCache, LRUCache, TieredCache
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", os.cpu_count() or 1))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 4))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 50))
+PAGE_BREAK = "\f"
+PDF_TEXT_CACHE_BYTES = int(os.getenv("PDF_TEXT_CACHE_BYTES", 32 * 1024 * 1024))
+PDF_TEXT_CACHE_DIR = os.getenv("PDF_TEXT_CACHE_DIR")
+# Spooled uploads up to this size are read rather than memory-mapped.
+SPOOLED_READ_MAX = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+text_cache = TieredCache(
+    LRUCache(PDF_TEXT_CACHE_BYTES, sizeof=lambda text: len(text.encode("utf-8"))),
+    DirectoryCache(PDF_TEXT_CACHE_DIR) if PDF_TEXT_CACHE_DIR else None,
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _upload_file(upload):
+    # werkzeug's FileStorage exposes the body as .stream, Django's
+    # UploadedFile as .file; plain file objects and bytes pass through.
+    return getattr(upload, "stream", None) or getattr(upload, "file", None) or upload
+
+
+def _fileno(f):
+    if isinstance(f, io.BytesIO):
+        return None
+    if isinstance(f, SpooledTemporaryFile):
+        # fileno() moves a spooled file still held in memory to disk, so
+        # small ones are read instead. Larger ones are on disk already;
+        # rollover() is then a no-op.
+        f.seek(0, os.SEEK_END)
+        if f.tell() <= SPOOLED_READ_MAX:
+            return None
+        f.rollover()
+    try:
+        return f.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+@contextmanager
+def open_upload(upload):
+    """Yield the contents of an upload as a read-only buffer.
+
+    Uploads the framework kept in memory are returned as ``bytes``. Large
+    uploads the framework already spooled to a temporary file are
+    memory-mapped rather than copied into the process.
+    """
+    if isinstance(upload, (bytes, bytearray)):
+        yield bytes(upload)
+        return
+
+    f = _upload_file(upload)
+    fileno = _fileno(f)
+    if fileno is None:
+        f.seek(0)
+        yield f.read()
+        return
+
+    f.flush()
+    if os.fstat(fileno).st_size == 0:
+        yield b""
+        return
+
+    buf = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    try:
+        yield buf
+    finally:
+        buf.close()
+
+
+def _open_reader(buf):
+    stream = buf if isinstance(buf, mmap.mmap) else io.BytesIO(buf)
+    return PdfReader(stream)
+
+
+def _extract_pages(reader, start, stop):
+    return [reader.pages[i].extract_text() for i in range(start, stop)]
+
+
+def _extract_page_range(data, start, stop):
+    # Runs in a pool worker, which opens its own reader over the same bytes.
+    return _extract_pages(_open_reader(data), start, stop)
+
+
+def _noop():
+    return None
+
+
+def get_pool():
+    """Return the shared extraction pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+        return _pool
+
+
+def warm_pool():
+    """Start every pool worker up front so the first request doesn't pay for it."""
+    if PDF_EXTRACT_WORKERS < 2:
+        return
+    pool = get_pool()
+    for future in [pool.submit(_noop) for _ in range(PDF_EXTRACT_WORKERS)]:
+        future.result()
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _page_ranges(page_count, parts):
+    size = -(-page_count // parts)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def extract_text(buf):
+    """Extract the text of every page of the PDF held in ``buf``.
+
+    At most ``PDF_MAX_PAGES`` pages are read. Documents with at least
+    ``PDF_PARALLEL_MIN_PAGES`` pages are split into contiguous page ranges,
+    one per pool worker, and the per-page results joined in a single pass.
+    """
+    reader = _open_reader(buf)
+    page_count = min(len(reader.pages), PDF_MAX_PAGES)
+    if len(reader.pages) > PDF_MAX_PAGES:
+        logger.warning("PDF has %d pages; only the first %d are read", len(reader.pages), PDF_MAX_PAGES)
+    workers = min(PDF_EXTRACT_WORKERS, page_count)
+
+    if workers < 2 or page_count < PDF_PARALLEL_MIN_PAGES:
+        return PAGE_BREAK.join(_extract_pages(reader, 0, page_count))
+
+    data = bytes(buf)
+    try:
+        pool = get_pool()
+        futures = [
+            pool.submit(_extract_page_range, data, start, stop)
+            for start, stop in _page_ranges(page_count, workers)
+        ]
+        pages = [future.result() for future in futures]
+    except BrokenProcessPool:
+        # A worker died (OOM, killed); replace the pool for the next request
+        # and finish this one inline.
+        _reset_pool()
+        return PAGE_BREAK.join(_extract_pages(reader, 0, page_count))
+
+    return PAGE_BREAK.join(chain.from_iterable(pages))
+
+
+def _normalize_page(page):
+    page = unicodedata.normalize("NFKC", page).replace("\x00", "")
+    return "\n".join(line.rstrip() for line in page.splitlines())
+
+
+def normalize_text(text):
+    """Fold compatibility characters (ligatures, odd spaces) and trim lines."""
+    return PAGE_BREAK.join(_normalize_page(page) for page in text.split(PAGE_BREAK))
+
+
+def read_pdf_upload(upload):
+    """Extract normalized text from an uploaded PDF without writing it to disk."""
+    with open_upload(upload) as buf:
+        key = hashlib.sha256(buf).hexdigest()
+        text = text_cache.get(key)
+        if text is None:
+            text = normalize_text(extract_text(buf))
+            text_cache.set(key, text)
+        return text
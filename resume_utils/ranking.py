@@ -0,0 +1,171 @@
+"""
+Ranking many stored resumes against one job description.
+
+Every stored resume keeps a precomputed term vector (``term_vector``): its
+``keywords.tokenize`` terms weighted 1 + log(count) and scaled to unit
+length. ``RankingIndex`` packs the vectors of one owner's stored resumes
+into one sparse matrix, stored column by column (CSC), and scores them all against
+a job description with a single sparse matrix-vector product: the cosine
+similarity between each resume and the posting's weighted top terms
+(``keywords.job_terms``). Only the matrix columns of the terms the posting
+uses are read, so thousands of resumes rank in milliseconds.
+
+The scores are lexical, like ``keyword_match``; rerank the top few with the
+LLM matcher for a judgement on the ones that matter.
+
+``ResumeIndex`` keeps one index per owner, so an upload only invalidates
+its owner's index, and a rebuild only reads that owner's vectors.
+
+Settings (environment variables):
+    RANK_TOP_TERMS       job description terms a ranking uses (default: 50)
+    RANK_MAX_RESULTS     largest k a ranking returns (default: 500)
+    RANK_RERANK_MAX      top results reranked with the LLM, at most (default: 20)
+    RANK_RERANK_WORKERS  LLM reranking calls in flight per ranking (default: 8)
+    RANK_INDEX_OWNERS    owners whose indexes are kept in memory (default: 256)
+"""
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from .cache import LRUCache
+from .keywords import job_terms, tokenize
+
+RANK_TOP_TERMS = int(os.getenv("RANK_TOP_TERMS", 50))
+RANK_MAX_RESULTS = int(os.getenv("RANK_MAX_RESULTS", 500))
+RANK_RERANK_MAX = int(os.getenv("RANK_RERANK_MAX", 20))
+RANK_RERANK_WORKERS = int(os.getenv("RANK_RERANK_WORKERS", 8))
+RANK_INDEX_OWNERS = int(os.getenv("RANK_INDEX_OWNERS", 256))
+
+
+def _strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+
+
+def term_vector(resume_data):
+    """Unit-length ``{term: weight}`` vector of a parsed resume, for storage."""
+    counts = Counter(term for text in _strings(resume_data) for term in tokenize(text))
+    weights = {term: 1 + math.log(count) for term, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {term: round(weight / norm, 6) for term, weight in weights.items()} if norm else {}
+
+
+class RankingIndex:
+    """Term vectors of many resumes as one sparse matrix, for ranking.
+
+    ``entries`` are ``(key, vector)`` pairs.
+    """
+
+    def __init__(self, entries):
+        self.keys = []
+        vocabulary = {}
+        rows, columns, values = [], [], []
+        for row, (key, vector) in enumerate(entries):
+            self.keys.append(key)
+            for term, weight in vector.items():
+                rows.append(row)
+                columns.append(vocabulary.setdefault(term, len(vocabulary)))
+                values.append(weight)
+
+        self.vocabulary = vocabulary
+        columns = np.array(columns, dtype=np.int64)
+        order = np.argsort(columns, kind="stable")
+        self._rows = np.array(rows, dtype=np.int64)[order]
+        self._values = np.array(values, dtype=float)[order]
+        self._starts = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(columns, minlength=len(vocabulary)), out=self._starts[1:])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def scores(self, terms, weights):
+        """Cosine similarity of every resume with the ``terms`` vector, as an array."""
+        norm = np.linalg.norm(weights)
+        rows, products = [], []
+        for term, weight in zip(terms, weights):
+            column = self.vocabulary.get(term)
+            if column is None or not norm:
+                continue
+            start, end = self._starts[column], self._starts[column + 1]
+            rows.append(self._rows[start:end])
+            products.append(self._values[start:end] * (weight / norm))
+        if not rows:
+            return np.zeros(len(self))
+        return np.bincount(np.concatenate(rows), weights=np.concatenate(products), minlength=len(self))
+
+    def top(self, job_description, k):
+        """The ``k`` best ``(key, score)`` pairs for a job description, best first.
+
+        Resumes sharing no terms with it are left out.
+        """
+        terms, weights, _ = job_terms(job_description, top=RANK_TOP_TERMS)
+        scores = self.scores(terms, weights)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        best = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.keys[row], float(scores[row])) for row in best]
+
+
+class ResumeIndex:
+    """A ``RankingIndex`` per owner, each rebuilt only when that owner's resumes change.
+
+    Callers pass a ``stamp`` that changes whenever the owner's stored set
+    does (a count and a last-modified time) and a function returning the
+    owner's entries; an owner's index is only rebuilt when its stamp
+    differs from the last build. Indexes of owners not ranked for a while
+    are evicted.
+    """
+
+    def __init__(self, max_owners=RANK_INDEX_OWNERS):
+        self._lock = threading.Lock()
+        self._indexes = LRUCache(max_owners)
+        self.builds = 0
+        self.build_seconds = 0.0
+        self.rankings = 0
+        self.rank_seconds = 0.0
+
+    def get(self, owner, stamp, load_entries):
+        cached = self._indexes.get(owner)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        started = time.monotonic()
+        index = RankingIndex(load_entries())
+        self._indexes.set(owner, (stamp, index))
+        with self._lock:
+            self.builds += 1
+            self.build_seconds = time.monotonic() - started
+        return index
+
+    def rank(self, owner, stamp, load_entries, job_description, k):
+        """``RankingIndex.top`` on ``owner``'s current index."""
+        index = self.get(owner, stamp, load_entries)
+        started = time.monotonic()
+        ranked = index.top(job_description, k)
+        with self._lock:
+            self.rankings += 1
+            self.rank_seconds += time.monotonic() - started
+        return ranked
+
+    def stats(self):
+        with self._lock:
+            return {
+                "owners": self._indexes.stats(),
+                "builds": self.builds,
+                "last_build_ms": round(self.build_seconds * 1000, 3),
+                "rankings": self.rankings,
+                "avg_rank_ms": round(self.rank_seconds / self.rankings * 1000, 3) if self.rankings else 0.0,
+            }
+
+
+resume_index = ResumeIndex()
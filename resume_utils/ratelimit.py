@@ -0,0 +1,253 @@
+"""
+Client-side rate limiting and retry policy for LLM requests.
+
+A ``RateLimiter`` keeps requests-per-minute and tokens-per-minute token
+buckets, and also follows what the provider reports through its
+``x-ratelimit-*`` and ``retry-after`` headers. Callers wait for capacity
+instead of getting a 429. The number of callers allowed to wait, and how
+long each may wait, are bounded so bursts fail fast rather than piling up.
+
+Settings (environment variables):
+    LLM_RPM              client-side requests per minute, 0 to disable (default)
+    LLM_TPM              client-side tokens per minute, 0 to disable (default)
+    LLM_MAX_WAITERS      callers allowed to wait for capacity at once (default: 100)
+    LLM_MAX_WAIT         seconds a caller may wait before giving up (default: 30)
+    LLM_MAX_RETRIES      retries on 429/5xx and connection errors (default: 3)
+    LLM_BACKOFF_BASE     first backoff delay in seconds (default: 0.5)
+    LLM_BACKOFF_MAX      longest backoff delay in seconds (default: 20)
+"""
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+
+from .tokens import estimate_messages_tokens
+
+LLM_RPM = float(os.getenv("LLM_RPM", 0))
+LLM_TPM = float(os.getenv("LLM_TPM", 0))
+LLM_MAX_WAITERS = int(os.getenv("LLM_MAX_WAITERS", 100))
+LLM_MAX_WAIT = float(os.getenv("LLM_MAX_WAIT", 30))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 0.5))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 20))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class QueueFull(Exception):
+    """Raised when no capacity is available within the allowed wait."""
+
+
+def parse_duration(value):
+    """Parse ``retry-after`` / ``x-ratelimit-reset-*`` values into seconds.
+
+    Accepts plain seconds (``"7"``, ``"0.5"``) and Go-style durations
+    (``"2m59.56s"``, ``"120ms"``). Returns ``None`` if unparseable.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def estimate_payload_tokens(payload, prompt_tokens=None):
+    """Rough token cost of a chat payload, prompt plus expected completion."""
+    if prompt_tokens is None:
+        prompt_tokens = estimate_messages_tokens(payload.get("messages", []))
+    return prompt_tokens + payload.get("max_tokens", 1024)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Exponential backoff with full jitter, never shorter than ``retry_after``."""
+    delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute / 60`` per second.
+
+    Not thread-safe on its own; ``RateLimiter`` serializes access.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount):
+        # An oversized request only has to wait for a full bucket.
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+class RateLimiter:
+    """Shared scheduler in front of every LLM request in the process."""
+
+    def __init__(self, rpm=LLM_RPM, tpm=LLM_TPM, max_waiters=LLM_MAX_WAITERS, max_wait=LLM_MAX_WAIT):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_waiters = max_waiters
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._waiting = 0
+        # Provider-reported state, from the latest response headers.
+        self._blocked_until = 0.0
+        self._remote_requests = None
+        self._remote_requests_reset = 0.0
+        self._remote_tokens = None
+        self._remote_tokens_reset = 0.0
+        self.throttled = 0
+        self.rejected = 0
+        self.retries = 0
+
+    def _reserve(self, tokens):
+        """Take capacity for one request, or return how long to wait for it."""
+        now = time.monotonic()
+        waits = [self._blocked_until - now]
+        if self._remote_requests is not None and now < self._remote_requests_reset and self._remote_requests < 1:
+            waits.append(self._remote_requests_reset - now)
+        if self._remote_tokens is not None and now < self._remote_tokens_reset and self._remote_tokens < tokens:
+            waits.append(self._remote_tokens_reset - now)
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                waits.append(bucket.wait_for(amount))
+
+        wait = max(waits)
+        if wait > 0:
+            return wait
+
+        if self.requests is not None:
+            self.requests.level -= 1
+        if self.tokens is not None:
+            self.tokens.level -= min(tokens, self.tokens.capacity)
+        if self._remote_requests is not None:
+            self._remote_requests -= 1
+        if self._remote_tokens is not None:
+            self._remote_tokens -= tokens
+        return 0.0
+
+    def _enter(self):
+        with self._lock:
+            if self._waiting >= self.max_waiters:
+                self.rejected += 1
+                raise QueueFull("Too many LLM requests waiting for rate limit capacity")
+            self._waiting += 1
+
+    def _leave(self):
+        with self._lock:
+            self._waiting -= 1
+
+    def _next_wait(self, tokens, deadline):
+        with self._lock:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return 0.0
+            if time.monotonic() + wait > deadline:
+                self.rejected += 1
+                raise QueueFull("LLM rate limit capacity not available in time")
+            self.throttled += 1
+            return wait
+
+    def acquire(self, tokens):
+        """Block until one request of ``tokens`` tokens may be sent."""
+        self._enter()
+        try:
+            deadline = time.monotonic() + self.max_wait
+            while True:
+                wait = self._next_wait(tokens, deadline)
+                if wait <= 0:
+                    return
+                time.sleep(wait)
+        finally:
+            self._leave()
+
+    async def aacquire(self, tokens):
+        """Async version of ``acquire``."""
+        self._enter()
+        try:
+            deadline = time.monotonic() + self.max_wait
+            while True:
+                wait = self._next_wait(tokens, deadline)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+        finally:
+            self._leave()
+
+    def update(self, status_code, headers):
+        """Fold a response's rate limit headers into the scheduler.
+
+        Returns the provider's ``retry-after`` in seconds, if it sent one.
+        """
+        now = time.monotonic()
+        retry_after = parse_duration(headers.get("retry-after"))
+        with self._lock:
+            remaining = headers.get("x-ratelimit-remaining-requests")
+            if remaining is not None and remaining.isdigit():
+                self._remote_requests = int(remaining)
+                self._remote_requests_reset = now + (parse_duration(headers.get("x-ratelimit-reset-requests")) or 60)
+            remaining = headers.get("x-ratelimit-remaining-tokens")
+            if remaining is not None and remaining.isdigit():
+                self._remote_tokens = int(remaining)
+                self._remote_tokens_reset = now + (parse_duration(headers.get("x-ratelimit-reset-tokens")) or 60)
+            if status_code == 429:
+                # Everyone backs off, not just the caller that got the 429.
+                pause = retry_after if retry_after is not None else backoff_delay(0)
+                self._blocked_until = max(self._blocked_until, now + pause)
+        return retry_after
+
+    def _refund(self, estimated, used):
+        # Only what ``_reserve`` took can be given back; callers hold the lock.
+        if self.tokens is not None:
+            estimated = min(estimated, self.tokens.capacity)
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + estimated - used)
+
+    def settle(self, estimated, used):
+        """Refund the difference between the estimated and reported token usage."""
+        if used is None:
+            return
+        with self._lock:
+            self._refund(estimated, used)
+
+    def release(self, tokens):
+        """Refund the ``tokens`` reserved for a request that failed."""
+        with self._lock:
+            self._refund(tokens, 0)
+
+    def retry(self, tokens):
+        """Count a retry, refunding the ``tokens`` the failed attempt reserved."""
+        with self._lock:
+            self.retries += 1
+            self._refund(tokens, 0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "waiting": self._waiting,
+                "throttled": self.throttled,
+                "rejected": self.rejected,
+                "retries": self.retries,
+            }
+
+
+limiter = RateLimiter()
@@ -0,0 +1,76 @@
+"""
+Server-side store of parsed resumes, addressed by a stable resume ID.
+
+``/process`` returns a ``resume_id`` with every full parse: the SHA-256 of
+the resume text (``text_digest``), so the same resume always gets the same
+ID. The parse is kept under that ID, and the match endpoints accept the ID
+in place of the PDF, so a match costs one LLM call and no PDF work.
+
+Parses hold names, emails and phone numbers, and anyone with an ID can
+read its parse, so by default they are only kept in memory, for a day. An
+ID is then only known to the worker process that handed it out. An ID that
+has expired, was evicted or is unknown to this worker is simply unknown;
+the client uploads the resume again.
+
+Setting ``RESUME_STORE_BACKEND=sqlite`` opts in to keeping the parses on
+disk, in ``RESUME_STORE_PATH``, shared by every worker on the host and
+across restarts, for ``RESUME_STORE_TTL``.
+
+Settings (environment variables):
+    RESUME_STORE_BACKEND      memory (default), sqlite or django
+    RESUME_STORE_TTL          seconds a parsed resume is kept (default: 1 day)
+    RESUME_STORE_MAX_ENTRIES  resumes kept before LRU eviction (default: 10000)
+    RESUME_STORE_PATH         SQLite file used by the sqlite backend
+                              (default: resume_store.sqlite3, in the working
+                              directory)
+"""
+import json
+import os
+import re
+
+from .cache import make_cache
+from .llmcache import text_digest
+
+RESUME_STORE_BACKEND = os.getenv("RESUME_STORE_BACKEND", "memory")
+RESUME_STORE_TTL = int(os.getenv("RESUME_STORE_TTL", 24 * 60 * 60))
+RESUME_STORE_MAX_ENTRIES = int(os.getenv("RESUME_STORE_MAX_ENTRIES", 10_000))
+RESUME_STORE_PATH = os.getenv("RESUME_STORE_PATH", "resume_store.sqlite3")
+
+_RESUME_ID_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def is_resume_id(value):
+    """Whether ``value`` looks like a resume ID."""
+    return isinstance(value, str) and _RESUME_ID_RE.fullmatch(value) is not None
+
+
+class ResumeStore:
+    """Parsed resumes keyed by the digest of their text."""
+
+    def __init__(self, backend=RESUME_STORE_BACKEND):
+        self.backend = make_cache(
+            backend,
+            RESUME_STORE_MAX_ENTRIES,
+            ttl=RESUME_STORE_TTL,
+            path=RESUME_STORE_PATH,
+            name="resume_store",
+        )
+
+    def put(self, resume_text, parsed_data):
+        """Store a parse of ``resume_text``; returns its resume ID."""
+        resume_id = text_digest(resume_text)
+        self.backend.set(resume_id, json.dumps(parsed_data))
+        return resume_id
+
+    def get(self, resume_id):
+        """The parse stored under ``resume_id``, or ``None``."""
+        if not is_resume_id(resume_id):
+            return None
+        raw = self.backend.get(resume_id)
+        return json.loads(raw) if raw is not None else None
+
+    def stats(self):
+        return self.backend.stats()
+
+
+resume_store = ResumeStore()
@@ -0,0 +1,156 @@
+"""
+Schemas for the parser and matcher results, with validation and repair.
+
+A schema maps each key to its type:
+
+- ``"string"``: a string, ``None`` when missing;
+- ``"strings"``: a list of strings;
+- ``"skills"``: a list of skill names, with known skills renamed to their
+  ``resume_utils.skills`` display names ("k8s" -> "Kubernetes") and duplicates
+  dropped;
+- ``"score"``: an integer from 0 to 100;
+- a dict: a nested object with its own schema;
+- ``[dict]``: a list of objects of that schema.
+
+``conform`` coerces a parsed LLM reply into the schema in place instead of
+rejecting it. Missing keys get a default, ``"85%"`` becomes ``85``, a
+comma-separated string becomes a list, and a key that only differs in case
+is renamed. Keys outside the schema are left alone. It is one pass over the
+reply, cheap next to the LLM call it saves.
+"""
+import re
+import threading
+
+from .skills import get_skill_index
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_LIST_SPLIT_RE = re.compile(r"[,;\n]")
+
+
+class SchemaStats:
+    """How many results needed repairing to fit their schema."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.repaired = 0
+        self.fields_repaired = 0
+
+    def record(self, fields_repaired):
+        with self._lock:
+            self.checked += 1
+            if fields_repaired:
+                self.repaired += 1
+                self.fields_repaired += fields_repaired
+
+    def stats(self):
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "repaired": self.repaired,
+                "fields_repaired": self.fields_repaired,
+            }
+
+
+schema_stats = SchemaStats()
+
+
+def select_schema(field_schemas, fields):
+    """Combine the per-field schemas of the selected ``fields`` into one."""
+    schema = {}
+    for field in fields:
+        schema.update(field_schemas.get(field, {}))
+    return schema
+
+
+def _default(spec):
+    if spec == "score":
+        return 0
+    if spec in ("strings", "skills") or isinstance(spec, list):
+        return []
+    if isinstance(spec, dict):
+        return _conform(spec, {})[0]
+    return None
+
+
+def _to_string(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return ", ".join(text for text in map(_to_string, value) if text)
+    if isinstance(value, dict):
+        return ", ".join(text for text in map(_to_string, value.values()) if text)
+    if isinstance(value, bool) or value is None:
+        return None
+    return str(value)
+
+
+def _to_score(value):
+    if isinstance(value, str):
+        match = _NUMBER_RE.search(value)
+        value = float(match.group()) if match else 0
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return 0
+    if isinstance(value, float) and 0 < value < 1:
+        # A fraction, e.g. 0.85 for 85%.
+        value *= 100
+    return max(0, min(100, round(value)))
+
+
+def _to_strings(value):
+    if isinstance(value, str):
+        return [part.strip() for part in _LIST_SPLIT_RE.split(value) if part.strip()]
+    if isinstance(value, dict):
+        # Grouped lists like {"languages": [...], "frameworks": [...]}
+        return [item for group in value.values() for item in _to_strings(group)]
+    if isinstance(value, list):
+        return [text for text in map(_to_string, value) if text]
+    text = _to_string(value)
+    return [text] if text else []
+
+
+def coerce(value, spec):
+    """``value`` converted to the type described by ``spec``."""
+    if value is None:
+        return _default(spec)
+    if spec == "string":
+        return _to_string(value)
+    if spec == "score":
+        return _to_score(value)
+    if spec == "strings":
+        return _to_strings(value)
+    if spec == "skills":
+        return get_skill_index().normalize(_to_strings(value))
+    if isinstance(spec, list):
+        if isinstance(value, dict):
+            value = [value]
+        if not isinstance(value, list):
+            return []
+        return [_conform(spec[0], item)[0] for item in value if isinstance(item, dict)]
+    if isinstance(spec, dict):
+        return _conform(spec, value if isinstance(value, dict) else {})[0]
+    return value
+
+
+def _conform(schema, data):
+    repaired = 0
+    folded = None
+    for key, spec in schema.items():
+        if key not in data:
+            if folded is None:
+                folded = {name.casefold(): name for name in data}
+            if key.casefold() in folded:
+                data[key] = data.pop(folded[key.casefold()])
+        value = data.get(key)
+        fixed = coerce(value, spec)
+        if fixed != value or key not in data:
+            repaired += 1
+        data[key] = fixed
+    return data, repaired
+
+
+def conform(data, schema):
+    """Coerce ``data`` into ``schema`` in place and return it."""
+    data, repaired = _conform(schema, data)
+    schema_stats.record(repaired)
+    return data
@@ -0,0 +1,185 @@
+"""
+Resume segmentation and compaction before text is sent to the LLM.
+
+PDF text carries a lot of noise: running headers and footers repeated on
+every page, page numbers, and ragged whitespace. ``compact_resume`` removes
+it and splits what is left into sections (Experience, Education, Skills,
+...) under their detected headings, so the prompt only carries content.
+"""
+import logging
+import re
+import threading
+from collections import Counter
+
+from .tokens import estimate_tokens, fit_sections
+
+logger = logging.getLogger(__name__)
+
+PAGE_BREAK = "\f"
+
+# Canonical section name -> headings that introduce it.
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "about me", "objective", "career objective"),
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history"),
+    "education": ("education", "academic background", "qualifications", "academic qualifications"),
+    "skills": ("skills", "technical skills", "core competencies", "key skills", "technologies", "tech stack"),
+    "projects": ("projects", "personal projects", "key projects", "academic projects"),
+    "certifications": ("certifications", "certificates", "licenses", "licenses and certifications"),
+    "publications": ("publications", "research", "papers"),
+    "awards": ("awards", "honors", "honours", "achievements", "awards and honors"),
+    "languages": ("languages",),
+    "volunteer": ("volunteer", "volunteering", "volunteer experience"),
+    "interests": ("interests", "hobbies", "hobbies and interests"),
+    "references": ("references",),
+}
+# Lines at the top and bottom of a page checked for running headers/footers.
+EDGE_LINES = 3
+# Sections that never help the parser.
+DROPPED_SECTIONS = frozenset({"references"})
+
+_HEADING_LOOKUP = {
+    heading: name for name, headings in SECTION_HEADINGS.items() for heading in headings
+}
+_PAGE_NUMBER_RE = re.compile(r"^(?:page\s*)?[-–—]?\s*\d{1,3}\s*(?:(?:/|of)\s*\d{1,3})?\s*[-–—]?$", re.IGNORECASE)
+_SPACES_RE = re.compile(r"[ \t]+")
+# Page references inside running headers/footers: "Page 2", "2 of 3", "2/3",
+# or a number after a separator at the end ("Jane Doe | 2").
+_PAGE_REF_RE = re.compile(
+    r"\bpage\s*\d{1,3}\b|\b\d{1,3}\s*(?:/|of)\s*\d{1,3}\b|(?<=[|•·–—-])\s*\d{1,3}$", re.IGNORECASE
+)
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+
+
+class CompactionStats:
+    """Running totals of how much text compaction saves."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def record(self, before, after):
+        with self._lock:
+            self.requests += 1
+            self.tokens_before += before
+            self.tokens_after += after
+
+    def stats(self):
+        with self._lock:
+            saved = self.tokens_before - self.tokens_after
+            return {
+                "requests": self.requests,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "saved_ratio": round(saved / self.tokens_before, 3) if self.tokens_before else 0.0,
+            }
+
+
+compaction_stats = CompactionStats()
+
+
+def _line_key(line):
+    # Footers often differ only by the page number; nothing else may differ.
+    return _PAGE_REF_RE.sub("#", line.lower())
+
+
+def strip_boilerplate(pages):
+    """Drop page numbers and lines repeated across pages.
+
+    A line in the header or footer zone of a page counts as boilerplate when
+    the same text, up to the page number, appears there on most pages. Its
+    first occurrence is kept, since running headers usually carry the
+    candidate's name. Lines with a year in them are never boilerplate: they
+    are dates of jobs and degrees, which often sit at a page's edge.
+    """
+    pages = [[_SPACES_RE.sub(" ", line).strip() for line in page.splitlines()] for page in pages]
+    pages = [[line for line in page if line] for page in pages]
+
+    def edges(page):
+        return {
+            _line_key(line) for line in page[:EDGE_LINES] + page[-EDGE_LINES:] if not _YEAR_RE.search(line)
+        }
+
+    repeated = set()
+    if len(pages) > 1:
+        counts = Counter(key for page in pages for key in edges(page))
+        threshold = max(2, (len(pages) * 3 + 4) // 5)
+        repeated = {key for key, count in counts.items() if count >= threshold}
+
+    seen = set()
+    lines = []
+    for page in pages:
+        page_edges = edges(page) & repeated
+        for line in page:
+            if _PAGE_NUMBER_RE.match(line):
+                continue
+            key = _line_key(line)
+            if key in page_edges:
+                if key in seen:
+                    continue
+                seen.add(key)
+            lines.append(line)
+    return lines
+
+
+def _heading(line):
+    words = line.split()
+    if not words or len(words) > 5:
+        return None
+    candidate = re.sub(r"[^a-z& ]", "", line.lower()).replace("&", "and")
+    return _HEADING_LOOKUP.get(" ".join(candidate.split()))
+
+
+def segment(lines):
+    """Split lines into ``(section, heading, body_lines)`` tuples.
+
+    Text before the first recognised heading goes into a ``header`` section.
+    """
+    sections = [("header", None, [])]
+    for line in lines:
+        name = _heading(line)
+        if name is not None:
+            sections.append((name, line, []))
+        else:
+            sections[-1][2].append(line)
+    return [(name, heading, body) for name, heading, body in sections if heading or any(body)]
+
+
+def render(sections):
+    parts = []
+    for name, heading, body in sections:
+        text = "\n".join(body).strip()
+        parts.append(f"{heading}\n{text}" if heading else text)
+    return "\n\n".join(part for part in parts if part)
+
+
+def compact_sections(text):
+    """Segment form-feed separated page text, without boilerplate or dropped sections."""
+    return [
+        section for section in segment(strip_boilerplate(text.split(PAGE_BREAK)))
+        if section[0] not in DROPPED_SECTIONS
+    ]
+
+
+def compact_resume(text, max_tokens=None):
+    """Return resume text with boilerplate removed and sections tidied.
+
+    Pages in ``text`` are separated by form feeds, as produced by
+    ``resume_utils.pdftext``. If ``max_tokens`` is given, the lowest-priority
+    sections are truncated until the result fits. The estimated token
+    reduction is logged and added to ``compaction_stats``.
+    """
+    sections = compact_sections(text)
+    compacted = render(sections)
+    if max_tokens is not None and estimate_tokens(compacted) > max_tokens:
+        sections = fit_sections(sections, max_tokens)
+        compacted = render(sections)
+
+    before, after = estimate_tokens(text), estimate_tokens(compacted)
+    compaction_stats.record(before, after)
+    logger.info(
+        "Compacted resume from ~%d to ~%d tokens (%d sections)", before, after, len(sections)
+    )
+    return compacted
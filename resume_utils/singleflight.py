@@ -0,0 +1,81 @@
+"""
+Single-flight request coalescing.
+
+When several callers ask for the same key at the same time, only the first
+one (the leader) runs the work; the others wait for its result instead of
+repeating it. Results are not kept once the call finishes; the LLM result
+caches handle that. Coalescing happens within one process, across threads
+(``do``) or across tasks on the same event loop (``ado``).
+"""
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` unless a call for ``key`` is already running."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            # Followers get their own copy so nobody mutates a shared result.
+            return copy.deepcopy(future.result())
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(self, key, coro_fn, *args, **kwargs):
+        """Async version of ``do`` for coroutine functions."""
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(loop_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[loop_key] = asyncio.ensure_future(coro_fn(*args, **kwargs))
+                task.add_done_callback(lambda _: self._forget(loop_key))
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        # shield() so a cancelled follower doesn't cancel the shared call.
+        result = await asyncio.shield(task)
+        return result if leader else copy.deepcopy(result)
+
+    def _forget(self, loop_key):
+        with self._lock:
+            self._tasks.pop(loop_key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "followers": self.followers,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
+
+
+inflight = SingleFlight()
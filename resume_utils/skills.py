@@ -0,0 +1,171 @@
+"""
+Skill taxonomy: consistent skill detection in resumes and job descriptions.
+
+``skills.json`` maps a canonical skill ID to its display name and the
+other ways people write it (``"k8s"`` for Kubernetes, ``"js"`` for
+JavaScript). All the spellings are compiled into one Aho-Corasick
+automaton, so ``SkillIndex.find`` reports every skill in a text in a
+single pass over it, however many spellings there are. Matches must sit on
+word boundaries, and overlapping matches resolve to the longest
+leftmost one, so "Machine Learning" doesn't also count as "ML".
+
+Spellings are matched ignoring case, except for those listed under
+``"exact"``: "Go" is a language, "go" is not.
+
+The index is built once per process by ``get_skill_index`` and shared;
+it is read-only after construction.
+
+Settings (environment variables):
+    SKILL_TAXONOMY  extra JSON file in the same format, merged over the
+                    bundled one (same IDs replace bundled entries)
+"""
+import json
+import os
+import threading
+from collections import deque, namedtuple
+
+SKILL_TAXONOMY = os.getenv("SKILL_TAXONOMY")
+BUNDLED_TAXONOMY = os.path.join(os.path.dirname(__file__), "skills.json")
+
+SkillMatch = namedtuple("SkillMatch", "skill_id start end")
+
+
+def _lower(ch):
+    # Keep one character per character so match offsets stay valid.
+    lowered = ch.lower()
+    return lowered if len(lowered) == 1 else ch
+
+
+def _is_word(ch):
+    return ch.isalnum() or ch == "_"
+
+
+class SkillIndex:
+    def __init__(self, taxonomy):
+        self._names = {}
+        # Spelling (lower-cased) -> (skill ID, exact spelling or None)
+        self._spellings = {}
+        for skill_id, entry in taxonomy.items():
+            self._names[skill_id] = entry["name"]
+            exact = entry.get("exact", ())
+            for spelling in (entry["name"], *entry.get("aliases", ())):
+                if spelling not in exact:
+                    self._spellings[self._key(spelling)] = (skill_id, None)
+            for spelling in exact:
+                self._spellings[self._key(spelling)] = (skill_id, spelling)
+
+        # Trie of the spellings: goto transitions, failure links, and the
+        # (length, skill ID, exact spelling) outputs ending at each node.
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for spelling, (skill_id, exact) in self._spellings.items():
+            node = 0
+            for ch in spelling:
+                child = self._goto[node].get(ch)
+                if child is None:
+                    child = self._goto[node][ch] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = child
+            self._out[node].append((len(spelling), skill_id, exact))
+        self._link()
+
+    @staticmethod
+    def _key(spelling):
+        return "".join(map(_lower, spelling.strip()))
+
+    def _link(self):
+        # Breadth first, so a node's failure target is always linked first.
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def __len__(self):
+        return len(self._names)
+
+    def name(self, skill_id):
+        """Display name of a skill."""
+        return self._names[skill_id]
+
+    def canonical(self, text):
+        """Skill ID of ``text`` if it is a spelling of one skill, else ``None``."""
+        found = self._spellings.get(self._key(text))
+        if found is None:
+            return None
+        skill_id, exact = found
+        return skill_id if exact is None or exact == text.strip() else None
+
+    def find(self, text):
+        """``SkillMatch``es in ``text``, in order and without overlaps."""
+        goto, fail, out = self._goto, self._fail, self._out
+        candidates = []
+        node = 0
+        for end, ch in enumerate(text, 1):
+            ch = _lower(ch)
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, skill_id, exact in out[node]:
+                start = end - length
+                if start > 0 and _is_word(text[start - 1]) and _is_word(text[start]):
+                    continue
+                if end < len(text) and _is_word(text[end]) and _is_word(text[end - 1]):
+                    continue
+                if exact is not None and text[start:end] != exact:
+                    continue
+                candidates.append(SkillMatch(skill_id, start, end))
+
+        # Leftmost-longest, non-overlapping.
+        candidates.sort(key=lambda match: (match.start, -match.end))
+        matches = []
+        covered = 0
+        for match in candidates:
+            if match.start >= covered:
+                matches.append(match)
+                covered = match.end
+        return matches
+
+    def skills(self, text):
+        """Distinct skill IDs found in ``text``, in order of first mention."""
+        return list(dict.fromkeys(match.skill_id for match in self.find(text)))
+
+    def normalize(self, skills):
+        """``skills`` with known ones renamed to their display names, deduplicated."""
+        names = {}
+        for skill in skills:
+            skill_id = self.canonical(skill)
+            name = self._names[skill_id] if skill_id else skill
+            names.setdefault(name.casefold(), name)
+        return list(names.values())
+
+
+def load_taxonomy(paths):
+    taxonomy = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            taxonomy.update(json.load(f))
+    return taxonomy
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_skill_index():
+    """Return the process-wide skill index, building it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            paths = [BUNDLED_TAXONOMY] + ([SKILL_TAXONOMY] if SKILL_TAXONOMY else [])
+            _index = SkillIndex(load_taxonomy(paths))
+        return _index
@@ -0,0 +1,41 @@
+"""
+Server-Sent Events and NDJSON formatting for the streaming endpoints.
+
+Streaming generators yield ``(event, data)`` pairs; ``sse_stream`` turns
+them into ``text/event-stream`` frames with the data JSON-encoded on a
+single line, and ``ndjson_stream`` into one ``{"event": ..., "data": ...}``
+JSON object per line, for clients that would rather not parse SSE.
+"""
+import json
+
+SSE_CONTENT_TYPE = "text/event-stream"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+STREAM_FORMATS = ("ndjson", "sse")
+# Stop proxies (nginx) from buffering the stream until it ends.
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def parse_format(value, default="ndjson"):
+    """The stream format named by a request parameter; ``default`` if empty.
+
+    Raises ``ValueError`` for an unknown format.
+    """
+    if not value:
+        return default
+    if value not in STREAM_FORMATS:
+        raise ValueError(f"Unknown format {value!r}; use one of: {', '.join(STREAM_FORMATS)}")
+    return value
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_stream(events):
+    for event, data in events:
+        yield sse_event(event, data)
+
+
+def ndjson_stream(events):
+    for event, data in events:
+        yield json.dumps({"event": event, "data": data}) + "\n"
@@ -0,0 +1,331 @@
+"""
+Local stand-in for the Groq chat completions API, for load tests and
+offline runs.
+
+    python -m resume_utils.stubserver --port 8999 --latency lognormal:0.8,0.5 --error-rate 0.02
+    cd backend && LLM_BASE_URL=http://127.0.0.1:8999 python app.py
+
+``POST .../chat/completions`` is answered the way the real API answers it,
+streamed or not, with ``usage`` counts. Replies are either:
+
+- canned: a resume parse with the fields the prompt asks for, a match
+  analysis (or just its recommendations), or a job description,
+  depending on the prompt;
+- replayed from a ``resume_utils.cassette`` file (``--cassette``), so recorded
+  real replies come back under load. Requests not on the cassette get a
+  canned reply.
+
+Each request waits for a latency drawn from ``--latency``, plus generation
+time at ``--tokens-per-second``. ``--error-rate`` and
+``--rate-limit-rate`` make that fraction of requests fail with a 500 or
+a 429, and ``--rpm`` / ``--tpm`` enforce per-minute quotas with Groq's
+``x-ratelimit-*`` headers, so the retry and pacing paths get exercised.
+
+Latency specs: ``0.5`` or ``constant:0.5``, ``uniform:LOW,HIGH``,
+``normal:MEAN,STDDEV``, ``lognormal:MEDIAN,SIGMA`` and ``exponential:MEAN``,
+all in seconds.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .cassette import Cassette, CassetteMiss
+from .tokens import estimate_messages_tokens, estimate_tokens
+
+_FIELD_LINE_RE = re.compile(r"^( *)- (\w+)(.*)$", re.M)
+
+# Values for the resume fields the parser prompts ask for, by key or by
+# "parent.key" for the entries of a list.
+_SAMPLE_RESUME = {
+    "name": "Jane Doe",
+    "address": "San Francisco, CA",
+    "summary": "Backend engineer with six years of experience building Python web services. Led the move of a monolith to containerized services.",
+    "skills": ["Python", "Django", "Flask", "PostgreSQL", "Docker", "AWS"],
+    "experience_title": "Senior Software Engineer",
+    "title": "Senior Software Engineer",
+    "company": "Acme Corp",
+    "start_date": "2019-03",
+    "end_date": "Present",
+    "experience_detail": "Built and operated the billing API serving 2M requests a day.",
+    "description": "Built and operated the billing API serving 2M requests a day.",
+    "degree": "B.Sc. Computer Science",
+    "university": "State University",
+    "graduation_year": "2018",
+    "project_title": "Resume Parser",
+    "project_detail": "Parses PDF resumes into structured JSON with an LLM.",
+    "project_technologies": ["Python", "Flask"],
+    "projects.name": "Resume Parser",
+    "projects.description": "Parses PDF resumes into structured JSON with an LLM.",
+    "technologies": ["Python", "Flask"],
+}
+
+_SAMPLE_MATCH = {
+    "overallMatch": 72,
+    "skillsMatch": 68,
+    "experienceMatch": 80,
+    "educationMatch": 75,
+    "missingKeywords": ["Kubernetes", "Terraform"],
+    "recommendedImprovements": [
+        "Mention any container orchestration experience.",
+        "Quantify the impact of the billing API work.",
+    ],
+}
+
+_SAMPLE_JOB_DESCRIPTION = (
+    "Senior Backend Engineer\n\n"
+    "We are looking for a backend engineer to design and run the Python services behind our platform.\n\n"
+    "Requirements:\n"
+    "- 5+ years of Python web development (Django or Flask)\n"
+    "- PostgreSQL and Docker in production\n"
+    "- Experience with AWS\n"
+)
+
+
+def parse_latency(spec, rng=random):
+    """A function drawing latencies in seconds, from a spec like ``uniform:0.2,1``."""
+    kind, _, params = spec.partition(":")
+    if not params:
+        kind, params = "constant", kind
+    values = [float(value) for value in params.split(",")]
+    distributions = {
+        "constant": lambda value: lambda: value,
+        "uniform": lambda low, high: lambda: rng.uniform(low, high),
+        "normal": lambda mean, stddev: lambda: rng.gauss(mean, stddev),
+        "lognormal": lambda median, sigma: lambda: rng.lognormvariate(math.log(median), sigma),
+        "exponential": lambda mean: lambda: rng.expovariate(1 / mean),
+    }
+    if kind not in distributions:
+        raise ValueError(f"Unknown latency distribution {kind!r}; use one of {', '.join(distributions)}")
+    draw = distributions[kind](*values)
+    return lambda: max(0.0, draw())
+
+
+def canned_resume(prompt):
+    """A parse result with the fields listed in a resume parser ``prompt``."""
+    # Bullet points in the resume itself are not field names.
+    instructions = prompt.split("Resume text:")[0]
+    lines = _FIELD_LINE_RE.findall(instructions)
+    base = min((len(indent) for indent, _, _ in lines), default=0)
+    result = {}
+    entries = parent = None
+    for indent, key, rest in lines:
+        if len(indent) > base and entries is not None:
+            entries[0][key] = _SAMPLE_RESUME.get(f"{parent}.{key}", _SAMPLE_RESUME.get(key, f"Sample {key}"))
+        elif "list of" in rest:
+            entries, parent = [{}], key
+            result[key] = entries
+        else:
+            entries = None
+            result[key] = _SAMPLE_RESUME.get(key, f"Sample {key}")
+    return result
+
+
+def canned_reply(payload):
+    """Completion text for ``payload``, chosen by what its prompt asks for."""
+    prompt = payload["messages"][-1]["content"]
+    if "overallMatch" in prompt:
+        return json.dumps(_SAMPLE_MATCH)
+    if "recommendedImprovements" in prompt:
+        return json.dumps({"recommendedImprovements": _SAMPLE_MATCH["recommendedImprovements"]})
+    if "job description generator" in prompt:
+        return _SAMPLE_JOB_DESCRIPTION
+    if "Resume text:" in prompt:
+        return json.dumps(canned_resume(prompt))
+    return "{}" if payload.get("response_format") else "OK"
+
+
+class Quota:
+    """Requests and tokens used in the current minute, against optional limits."""
+
+    def __init__(self, rpm=0, tpm=0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._lock = threading.Lock()
+        self._window = 0
+        self._requests = 0
+        self._tokens = 0
+
+    def take(self, tokens):
+        """Count a request; return ``(allowed, headers)``."""
+        with self._lock:
+            now = time.time()
+            window = int(now // 60)
+            if window != self._window:
+                self._window, self._requests, self._tokens = window, 0, 0
+            reset = f"{60 - now % 60:.2f}s"
+            allowed = (not self.rpm or self._requests < self.rpm) and (not self.tpm or self._tokens + tokens <= self.tpm)
+            if allowed:
+                self._requests += 1
+                self._tokens += tokens
+            headers = {}
+            if self.rpm:
+                headers["x-ratelimit-remaining-requests"] = str(max(0, self.rpm - self._requests))
+                headers["x-ratelimit-reset-requests"] = reset
+            if self.tpm:
+                headers["x-ratelimit-remaining-tokens"] = str(max(0, self.tpm - self._tokens))
+                headers["x-ratelimit-reset-tokens"] = reset
+            if not allowed:
+                headers["retry-after"] = str(math.ceil(60 - now % 60))
+            return allowed, headers
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency="0", tokens_per_second=0, error_rate=0.0,
+                 rate_limit_rate=0.0, rpm=0, tpm=0, cassette=None, seed=None):
+        super().__init__(address, StubHandler)
+        self.random = random.Random(seed)
+        self.latency = parse_latency(latency, self.random)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.quota = Quota(rpm, tpm)
+        self.cassette = Cassette(cassette, "replay") if cassette else None
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length))
+            messages = payload["messages"]
+        except (ValueError, KeyError, TypeError):
+            return self._send_json(400, {"error": {"message": "Invalid request body", "type": "invalid_request_error"}})
+        if not self.path.endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+        server = self.server
+        server.count()
+        prompt_tokens = estimate_messages_tokens(messages)
+        allowed, quota_headers = server.quota.take(prompt_tokens + (payload.get("max_tokens") or 0))
+        roll = server.random.random()
+        if not allowed or roll < server.rate_limit_rate:
+            quota_headers.setdefault("retry-after", "1")
+            error = {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}
+            return self._send_json(429, {"error": error}, quota_headers)
+
+        time.sleep(server.latency())
+        if roll < server.rate_limit_rate + server.error_rate:
+            return self._send_json(500, {"error": {"message": "Internal server error", "type": "internal_server_error"}})
+
+        if server.cassette is not None:
+            try:
+                entry = server.cassette.play(payload)
+            except CassetteMiss:
+                pass
+            else:
+                return self._send(entry["status_code"], entry["body"].encode("utf-8"), entry["headers"])
+
+        content = canned_reply(payload)
+        completion_tokens = estimate_tokens(content)
+        if payload.get("stream"):
+            return self._send_stream(payload, content, quota_headers)
+        if server.tokens_per_second:
+            time.sleep(completion_tokens / server.tokens_per_second)
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }, quota_headers)
+
+    def _send_stream(self, payload, content, headers):
+        # A few words per chunk, roughly like the real API.
+        pieces = re.findall(r"\S*\s*", content)[:-1] or [content]
+        delay = estimate_tokens(content) / self.server.tokens_per_second / len(pieces) if self.server.tokens_per_second else 0
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        for piece in pieces:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def _send_json(self, status, body, headers=None):
+        self._send(status, json.dumps(body).encode("utf-8"), dict(headers or {}, **{"Content-Type": "application/json"}))
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Groq chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency", default="0", help="latency distribution, e.g. lognormal:0.8,0.5")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="generation speed; 0 for instant")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with a 429")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before 429s; 0 for no limit")
+    parser.add_argument("--tpm", type=int, default=0, help="tokens per minute before 429s; 0 for no limit")
+    parser.add_argument("--cassette", help="replay recorded replies from this cassette file")
+    parser.add_argument("--seed", type=int, help="seed for reproducible latencies and errors")
+    args = parser.parse_args(argv)
+    try:
+        parse_latency(args.latency)
+    except ValueError as e:
+        parser.error(str(e))
+
+    server = StubServer(
+        (args.host, args.port),
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        cassette=args.cassette,
+        seed=args.seed,
+    )
+    print(f"Stub LLM server on http://{args.host}:{args.port}; set LLM_BASE_URL to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
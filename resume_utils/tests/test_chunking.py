@@ -0,0 +1,36 @@
+import unittest
+
+from resume_utils.chunking import merge_partials
+
+EXPERIENCE = ("experience_title", "company", "start_date")
+
+
+class MergePartialsTests(unittest.TestCase):
+    def test_lists_concatenate_without_duplicates(self):
+        merged = merge_partials([{"skills": ["Python", "Go"]}, {"skills": ["python", "Rust"]}])
+        self.assertEqual(merged, {"skills": ["Python", "Go", "Rust"]})
+
+    def test_first_non_empty_scalar_wins(self):
+        self.assertEqual(merge_partials([{"name": ""}, {"name": "Jane"}, {"name": "J. Doe"}]), {"name": "Jane"})
+
+    def test_flat_records_stay_aligned(self):
+        partials = [
+            {"name": "Jane", "experience_title": "Engineer", "company": "", "start_date": "2019"},
+            {"experience_title": "Developer", "company": "OldCo", "start_date": "2015"},
+            # The same job seen again, in the overlap between chunks.
+            {"experience_title": "engineer", "company": "", "start_date": "2019"},
+            {"experience_title": "", "company": "", "start_date": ""},
+        ]
+        self.assertEqual(merge_partials(partials, (EXPERIENCE,)), {
+            "name": "Jane",
+            "experience_title": "Engineer; Developer",
+            "company": "; OldCo",
+            "start_date": "2019; 2015",
+        })
+
+    def test_one_record_is_kept_as_is(self):
+        partials = [{"experience_title": "Engineer", "company": "Acme"}, {"name": "Jane"}]
+        self.assertEqual(
+            merge_partials(partials, (EXPERIENCE,)),
+            {"name": "Jane", "experience_title": "Engineer", "company": "Acme"},
+        )
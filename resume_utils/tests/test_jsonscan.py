@@ -0,0 +1,43 @@
+import json
+import unittest
+
+from resume_utils.jsonscan import extract_json, parse_json
+
+
+class ExtractJsonTests(unittest.TestCase):
+    def test_fences_and_commentary(self):
+        reply = 'Here is the JSON:\n```json\n{"name": "Jane"}\n```\nLet me know if you need more.'
+        self.assertEqual(parse_json(reply), {"name": "Jane"})
+
+    def test_only_the_first_object(self):
+        self.assertEqual(parse_json('{"a": 1} and also {"b": 2}'), {"a": 1})
+
+    def test_trailing_commas(self):
+        self.assertEqual(parse_json('{"skills": ["Python", "Go",], "years": 3,}'), {"skills": ["Python", "Go"], "years": 3})
+
+    def test_brackets_and_quotes_inside_strings(self):
+        reply = r'{"summary": "Uses {braces} and [brackets], says \"hi\"", "ok": true}'
+        self.assertEqual(parse_json(reply), {"summary": 'Uses {braces} and [brackets], says "hi"', "ok": True})
+
+    def test_unterminated_string(self):
+        self.assertEqual(parse_json('{"name": "Jane", "summary": "Backend eng'), {"name": "Jane", "summary": "Backend eng"})
+
+    def test_cut_off_after_escape(self):
+        self.assertEqual(parse_json('{"path": "C:\\'), {"path": "C:"})
+
+    def test_truncated_nested_values_are_closed(self):
+        reply = '{"experience": [{"title": "Engineer", "skills": ["Python"'
+        self.assertEqual(parse_json(reply), {"experience": [{"title": "Engineer", "skills": ["Python"]}]})
+
+    def test_dangling_key_comma_and_colon(self):
+        self.assertEqual(parse_json('{"a": 1, "b"'), {"a": 1})
+        self.assertEqual(parse_json('{"a": 1,'), {"a": 1})
+        self.assertEqual(parse_json('{"a": 1, "b":'), {"a": 1, "b": None})
+
+    def test_no_object(self):
+        self.assertIsNone(extract_json("I could not parse this resume."))
+        with self.assertRaises(json.JSONDecodeError):
+            parse_json("I could not parse this resume.")
+
+    def test_raw_control_characters_in_strings(self):
+        self.assertEqual(parse_json('{"summary": "line one\nline two"}'), {"summary": "line one\nline two"})
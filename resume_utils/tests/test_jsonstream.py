@@ -0,0 +1,38 @@
+import json
+import unittest
+
+from resume_utils.jsonstream import FieldStream
+
+REPLY = 'Sure!\n```json\n' + json.dumps({
+    "name": 'Jane "JD" Doe',
+    "skills": ["Python", "C++, C#"],
+    "experience": [{"title": "Engineer", "detail": "Closed {braces} and [brackets]"}],
+    "years": 7,
+    "website": None,
+}, indent=2) + '\n```'
+
+
+class FieldStreamTests(unittest.TestCase):
+    def feed(self, parts):
+        stream = FieldStream()
+        fields = [field for part in parts for field in stream.feed(part)]
+        return stream, fields
+
+    def test_fields_arrive_in_order_whatever_the_chunking(self):
+        expected = list(json.loads(REPLY[REPLY.index("{"):REPLY.rindex("}") + 1]).items())
+        for size in (1, 2, 3, 7, 64, len(REPLY)):
+            with self.subTest(size=size):
+                stream, fields = self.feed([REPLY[i:i + size] for i in range(0, len(REPLY), size)])
+                self.assertEqual(fields, expected)
+                self.assertEqual(stream.finish(), (dict(expected), []))
+                self.assertEqual(stream.text, REPLY)
+
+    def test_field_is_held_back_until_complete(self):
+        stream = FieldStream()
+        self.assertEqual(stream.feed('{"name": "Jane", "skills": ["Py'), [("name", "Jane")])
+        self.assertEqual(stream.feed('thon"], '), [("skills", ["Python"])])
+
+    def test_finish_repairs_a_cut_off_reply(self):
+        stream, fields = self.feed(['{"name": "Jane", "summary": "Backend eng'])
+        self.assertEqual(fields, [("name", "Jane")])
+        self.assertEqual(stream.finish(), ({"name": "Jane", "summary": "Backend eng"}, [("summary", "Backend eng")]))
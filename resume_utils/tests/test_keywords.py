@@ -0,0 +1,61 @@
+import unittest
+
+from resume_utils.keywords import keyword_match, tokenize
+
+JOB = (
+    "We are looking for a backend engineer to design, operate and write services on our platform. "
+    "Requirements: Python, Django, PostgreSQL, Redis, Docker, Kubernetes, AWS, Kafka, GraphQL and Terraform. "
+    "MS in Computer Science preferred."
+)
+SKILLS = ["Python", "Django", "PostgreSQL", "Redis", "Docker", "Kubernetes", "AWS", "Kafka", "GraphQL", "Terraform"]
+
+
+def resume(skills, degree="BS Computer Science"):
+    return {
+        "skills": skills,
+        "experience": [{"title": "Backend engineer", "description": "Built billing services"}],
+        "education": [{"degree": degree}],
+    }
+
+
+class KeywordMatchTests(unittest.TestCase):
+    def test_skills_score_counts_the_postings_skills(self):
+        self.assertEqual(keyword_match(resume(SKILLS[:6]), JOB)["skillsMatch"], 60)
+        self.assertEqual(keyword_match(resume(SKILLS), JOB)["skillsMatch"], 100)
+
+    def test_skills_found_under_other_spellings(self):
+        spelled = ["python3", "Django", "Postgres", "Redis", "Docker", "k8s", "AWS", "Kafka", "GraphQL", "Terraform"]
+        self.assertEqual(keyword_match(resume(spelled), JOB)["skillsMatch"], 100)
+
+    def test_missing_keywords_list_skills_first_without_generic_words(self):
+        result = keyword_match(resume(SKILLS[:6]), JOB)
+        self.assertEqual(result["missingKeywords"][:4], ["AWS", "Kafka", "GraphQL", "Terraform"])
+        for generic in ("design", "operate", "write", "platform"):
+            self.assertNotIn(generic, [keyword.casefold() for keyword in result["missingKeywords"]])
+        self.assertEqual(len(result["recommendedImprovements"]), 4)
+
+    def test_degree_requirements(self):
+        self.assertEqual(keyword_match(resume(SKILLS, degree="BS Computer Science"), JOB)["educationMatch"], 0)
+        self.assertEqual(keyword_match(resume(SKILLS, degree="M.S. Computer Science"), JOB)["educationMatch"], 100)
+        self.assertEqual(keyword_match(resume(SKILLS, degree="PhD in Computer Science"), JOB)["educationMatch"], 100)
+
+    def test_scores_depend_on_resume_and_posting_only(self):
+        first = keyword_match(resume(SKILLS[:6]), JOB)
+        for other in ("Senior Go engineer, gRPC and Kafka", "Data scientist: Python, pandas, SQL"):
+            keyword_match(resume(SKILLS), other)
+        self.assertEqual(keyword_match(resume(SKILLS[:6]), JOB), first)
+
+    def test_no_terms(self):
+        self.assertEqual(keyword_match(resume(SKILLS), "the and of")["overallMatch"], 0)
+
+
+class TokenizeTests(unittest.TestCase):
+    def test_degree_abbreviations_need_context(self):
+        self.assertEqual(tokenize("50 ms latency"), ["ms", "latency"])
+        self.assertEqual(tokenize("MS in Physics"), ["master", "physics"])
+        self.assertEqual(tokenize("BA degree"), ["bachelor", "degree"])
+        self.assertEqual(tokenize("M.S. Physics"), ["master", "physics"])
+        self.assertEqual(tokenize("MS"), ["master"])
+
+    def test_skills_become_one_term(self):
+        self.assertEqual(tokenize("Kubernetes and k8s"), ["skill:kubernetes", "skill:kubernetes"])
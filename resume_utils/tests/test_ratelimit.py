@@ -0,0 +1,110 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from resume_utils import llm
+from resume_utils.ratelimit import QueueFull, RateLimiter
+
+
+class FakeResponse:
+    def __init__(self, status_code, total_tokens=None):
+        self.status_code = status_code
+        self.headers = {}
+        self._total_tokens = total_tokens
+
+    def json(self):
+        return {"usage": {"total_tokens": self._total_tokens, "prompt_tokens": self._total_tokens}}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Answers each post with the next of ``outcomes``: a status code or an exception."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.posts = 0
+
+    def post(self, url, **kwargs):
+        self.posts += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(*outcome)
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_reserve_and_settle(self):
+        limiter = RateLimiter(rpm=0, tpm=1000)
+        limiter.acquire(300)
+        self.assertAlmostEqual(limiter.tokens.level, 700, delta=1)
+        # Used less than estimated: the difference comes back.
+        limiter.settle(300, 100)
+        self.assertAlmostEqual(limiter.tokens.level, 900, delta=1)
+        # Never above capacity.
+        limiter.settle(5000, 0)
+        self.assertEqual(limiter.tokens.level, 1000)
+
+    def test_retry_counts_and_refunds(self):
+        limiter = RateLimiter(rpm=0, tpm=1000)
+        limiter.acquire(400)
+        limiter.retry(400)
+        self.assertAlmostEqual(limiter.tokens.level, 1000, delta=1)
+        self.assertEqual(limiter.stats()["retries"], 1)
+
+    def test_oversized_requests_refund_what_they_took(self):
+        limiter = RateLimiter(rpm=0, tpm=1000)
+        limiter.acquire(5000)
+        self.assertAlmostEqual(limiter.tokens.level, 0, delta=1)
+        limiter.release(5000)
+        self.assertAlmostEqual(limiter.tokens.level, 1000, delta=1)
+
+    def test_queue_full(self):
+        limiter = RateLimiter(rpm=0, tpm=0, max_waiters=0)
+        with self.assertRaises(QueueFull):
+            limiter.acquire(1)
+        self.assertEqual(limiter.stats()["rejected"], 1)
+
+
+class ClientAccountingTests(unittest.TestCase):
+    PAYLOAD = {"model": "m", "messages": [{"role": "user", "content": "x" * 2000}], "max_tokens": 100}
+
+    def setUp(self):
+        self.limiter = RateLimiter(rpm=0, tpm=100_000)
+        patches = [
+            mock.patch.object(llm, "limiter", self.limiter),
+            mock.patch.object(llm, "backoff_delay", lambda *args, **kwargs: 0),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def client(self, outcomes, max_retries=2):
+        client = llm.LLMClient(base_url="http://llm.invalid", max_retries=max_retries)
+        client.session = FakeSession(outcomes)
+        return client
+
+    def test_failed_attempts_are_refunded(self):
+        client = self.client([(503,), (502,), (200, 700)])
+        response = client._post(self.PAYLOAD, False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.limiter.stats()["retries"], 2)
+        # Only the successful attempt's reported usage is still held.
+        self.assertAlmostEqual(self.limiter.tokens.level, 100_000 - 700, delta=1)
+
+    def test_final_error_is_refunded(self):
+        client = self.client([(503,), (503,), (503,)])
+        self.assertEqual(client._post(self.PAYLOAD, False).status_code, 503)
+        self.assertEqual(self.limiter.stats()["retries"], 2)
+        self.assertAlmostEqual(self.limiter.tokens.level, 100_000, delta=1)
+
+    def test_connection_errors_are_refunded(self):
+        error = requests.exceptions.ConnectionError("refused")
+        client = self.client([error, error], max_retries=1)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client._post(self.PAYLOAD, False)
+        self.assertEqual(client.session.posts, 2)
+        self.assertEqual(self.limiter.stats()["retries"], 1)
+        self.assertAlmostEqual(self.limiter.tokens.level, 100_000, delta=1)
@@ -0,0 +1,54 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from resume_utils.singleflight import SingleFlight
+
+
+class SingleFlightTests(unittest.TestCase):
+    def _concurrent(self, flight, fn, callers=4):
+        started, release = threading.Event(), threading.Event()
+
+        def leader_fn():
+            started.set()
+            release.wait(5)
+            return fn()
+
+        with ThreadPoolExecutor(callers) as pool:
+            futures = [pool.submit(flight.do, "key", leader_fn)]
+            started.wait(5)
+            futures += [pool.submit(flight.do, "key", leader_fn) for _ in range(callers - 1)]
+            # Let the followers reach the shared call before it finishes.
+            while flight.stats()["followers"] < callers - 1:
+                pass
+            release.set()
+            return futures
+
+    def test_followers_share_the_leaders_result(self):
+        flight = SingleFlight()
+        calls = []
+        futures = self._concurrent(flight, lambda: calls.append(1) or {"skills": ["Python"]})
+        results = [future.result() for future in futures]
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"skills": ["Python"]}] * 4)
+        # Followers get copies, so mutating one result can't affect another.
+        results[1]["skills"].append("Go")
+        self.assertEqual(results[0], {"skills": ["Python"]})
+        self.assertEqual(flight.stats(), {"leaders": 1, "followers": 3, "in_flight": 0})
+
+    def test_errors_reach_every_caller(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise RuntimeError("LLM down")
+
+        for future in self._concurrent(flight, fail):
+            with self.assertRaisesRegex(RuntimeError, "LLM down"):
+                future.result()
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+    def test_a_failed_key_runs_again(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do("key", int, "not a number")
+        self.assertEqual(flight.do("key", int, "7"), 7)
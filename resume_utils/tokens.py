@@ -0,0 +1,151 @@
+"""
+Local token estimates and per-model prompt budgets.
+
+The estimate is a regex heuristic, cheap enough to run on every call, used
+to keep prompts inside the context window before anything goes over the
+network. Actual usage reported by the API is recorded next to the
+estimates so any drift stays visible.
+
+Settings (environment variables):
+    LLM_COMPLETION_RESERVE  tokens kept free for the completion (default: 2048)
+"""
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+LLM_COMPLETION_RESERVE = int(os.getenv("LLM_COMPLETION_RESERVE", 2048))
+
+MODEL_CONTEXT_WINDOWS = {
+    "llama3-70b-8192": 8192,
+    "llama3-8b-8192": 8192,
+    "llama-3.1-8b-instant": 131072,
+    "llama-3.3-70b-versatile": 131072,
+    "gemma2-9b-it": 8192,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Lower numbers are kept longest when a resume has to be truncated.
+SECTION_PRIORITY = {
+    "header": 0,
+    "experience": 1,
+    "skills": 1,
+    "education": 2,
+    "summary": 3,
+    "projects": 3,
+    "certifications": 4,
+    "awards": 5,
+    "publications": 6,
+    "languages": 6,
+    "volunteer": 6,
+    "interests": 7,
+}
+LOWEST_PRIORITY = max(SECTION_PRIORITY.values()) + 1
+
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text):
+    """Approximate the number of tokens ``text`` encodes to.
+
+    Words count one token per ~six letters, each digit and punctuation mark
+    counts one.
+    """
+    return sum((len(piece) + 5) // 6 for piece in _PIECE_RE.findall(text))
+
+
+def estimate_messages_tokens(messages):
+    # Each message costs a few tokens of chat framing on top of its content.
+    return sum(estimate_tokens(message.get("content") or "") + 4 for message in messages)
+
+
+def context_window(model):
+    return MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def prompt_budget(model, overhead=0):
+    """Tokens left for variable content after the template and completion."""
+    return max(0, context_window(model) - LLM_COMPLETION_RESERVE - overhead)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut ``text`` at a line boundary so it fits in ``max_tokens``."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept = []
+    used = 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def fit_sections(sections, max_tokens):
+    """Trim ``(name, heading, body_lines)`` sections until they fit the budget.
+
+    Lines are removed from the end of the lowest-priority section first; a
+    section that loses all of its lines loses its heading too.
+    """
+    sections = [(name, heading, list(body)) for name, heading, body in sections]
+    costs = [
+        estimate_tokens(heading or "") + sum(estimate_tokens(line) + 1 for line in body)
+        for _, heading, body in sections
+    ]
+    total = sum(costs)
+    order = sorted(
+        range(len(sections)),
+        key=lambda i: (SECTION_PRIORITY.get(sections[i][0], LOWEST_PRIORITY), i),
+        reverse=True,
+    )
+    for i in order:
+        if total <= max_tokens:
+            break
+        name, heading, body = sections[i]
+        while body and total > max_tokens:
+            total -= estimate_tokens(body.pop()) + 1
+        if not body:
+            total -= estimate_tokens(heading or "")
+            sections[i] = None
+    if total > max_tokens:
+        logger.warning("Prompt still ~%d tokens over budget after truncation", total - max_tokens)
+    return [section for section in sections if section is not None]
+
+
+class TokenUsage:
+    """Running totals of estimated vs. reported prompt tokens."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.estimated = 0
+        self.reported_calls = 0
+        self.reported_estimated = 0
+        self.reported = 0
+
+    def record(self, model, estimated, reported=None):
+        logger.info("LLM call to %s: ~%d prompt tokens (reported: %s)", model, estimated, reported)
+        with self._lock:
+            self.calls += 1
+            self.estimated += estimated
+            if reported is not None:
+                self.reported_calls += 1
+                self.reported_estimated += estimated
+                self.reported += reported
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "estimated_prompt_tokens": self.estimated,
+                "avg_estimated_prompt_tokens": round(self.estimated / self.calls) if self.calls else 0,
+                "reported_prompt_tokens": self.reported,
+                "estimate_ratio": round(self.reported_estimated / self.reported, 3) if self.reported else None,
+            }
+
+
+token_usage = TokenUsage()